@@ -0,0 +1,125 @@
+import numpy as np
+import pandas as pd
+
+from scoring import POSITION_POINTS
+from standings import team_counts
+from stats import build_battles, character_counts, player_counts, position_counts
+from storage import LOG_COLUMNS
+
+# ==============================================================================
+# 物化统计表 (纯 pandas 计算)
+# ==============================================================================
+# 角色 / 选手 / 位置 / 队伍 的累计计数，保存在共享缓存里 (DataSnapshot.derive)。
+# 数据重新加载时整表构建一次；之后每次录入只做差量更新：
+#   新统计 = 旧统计 - 该场旧记录的贡献 + 该场新记录的贡献
+# 所以录入后的计算量只和这一场的几行数据有关，与历史数据量无关。
+# 积分榜 (standings.compute_standings) 和数据统计页 (stats.with_win_rate 等) 直接读这些表。
+
+TABLES = ("characters", "players", "positions", "teams")
+
+# 各计数表的列 (与 stats / standings 中构建出的表一致)
+TABLE_COLUMNS = {
+    "characters": ["Total_Battles", "Wins", "Total_Points"],
+    "players": ["Total_Battles", "Wins"],
+    "positions": ["Home", "Away"],
+    "teams": ["Points", "Matches", "Wins", "PointsAgainst", "ExtraWins"],
+}
+
+
+class Aggregates:
+    def __init__(self, characters, players, positions, teams):
+        self.characters = characters
+        self.players = players
+        self.positions = positions
+        self.teams = teams
+
+    @classmethod
+    def build(cls, df_schedule, df_logs):
+        if not set(LOG_COLUMNS).issubset(df_logs.columns):
+            # 空表 (例如 matchlogs 还没有任何记录) 时补齐列名
+            df_logs = df_logs.reindex(columns=LOG_COLUMNS)
+        battles = build_battles(df_logs)
+        return cls(
+            character_counts(battles),
+            player_counts(battles),
+            position_counts(df_logs),
+            team_counts(df_schedule, battles),
+        )
+
+    def replace_match(self, old_schedule, old_logs, new_schedule, new_logs):
+        # 参数只包含被重新提交的这一场比赛的 schedule 行和 matchlogs 行。
+        # 只有几行数据，直接用 Python 字典算出差量，不再走整套 pandas 构建流程
+        delta = {name: {} for name in TABLES}
+        _contribution(delta, old_schedule, old_logs, -1)
+        _contribution(delta, new_schedule, new_logs, 1)
+        return Aggregates(*(_combine(getattr(self, name), delta[name]) for name in TABLES))
+
+
+def _known(value):
+    # 与 groupby / crosstab 一致：空值不计入
+    return value is not None and not pd.isna(value)
+
+
+def _contribution(delta, df_schedule, df_logs, sign):
+    # 一场比赛对四张计数表的贡献 × sign，累加到 delta: {表名: {键: {列: 计数}}}
+    # 规则与 build() 相同：加赛里 "无" 的一方不计入，队伍数据只统计 Done 的比赛
+    def add(name, key, **counts):
+        row = delta[name].setdefault(key, dict.fromkeys(TABLE_COLUMNS[name], 0))
+        for column, n in counts.items():
+            row[column] += sign * n
+
+    logs = df_logs.to_dict("records")
+    for log in logs:
+        position, winner = log.get("Position"), log.get("Winner")
+        if _known(position) and winner in ("Home", "Away"):
+            add("positions", position, **{winner: 1})
+        for side in ("Home", "Away"):
+            player, char = log.get(f"{side}Player"), log.get(f"{side}Char")
+            if char == "无":
+                continue
+            is_win = int(winner == side)
+            if _known(char):
+                add("characters", char, Total_Battles=1, Wins=is_win,
+                    Total_Points=is_win * POSITION_POINTS.get(position, 0))
+            if _known(player):
+                add("players", player, Total_Battles=1, Wins=is_win)
+
+    for match in df_schedule.to_dict("records"):
+        if match.get("Status") != "Done":
+            continue
+        home_pts, away_pts = (match[col] if _known(match[col]) else 0
+                              for col in ("HomeTotalPoints", "AwayTotalPoints"))
+        for team, points_for, points_against in ((match["HomeTeam"], home_pts, away_pts),
+                                                 (match["AwayTeam"], away_pts, home_pts)):
+            if _known(team):
+                add("teams", team, Points=points_for, Matches=1, Wins=int(points_for > points_against),
+                    PointsAgainst=points_against)
+        for log in logs:
+            side = log.get("Winner")
+            if (log.get("MatchID") == match["MatchID"] and log.get("Position") == "Extra"
+                    and side in ("Home", "Away") and log.get(f"{side}Char") != "无"
+                    and _known(match[f"{side}Team"])):
+                add("teams", match[f"{side}Team"], ExtraWins=1)
+
+
+def _combine(base, delta):
+    # base 加上差量；表只有几十到几百行，直接在 numpy 数组上改，避免 DataFrame 对齐的开销
+    if not delta:
+        return base
+    keys = list(delta)
+    change = np.array([[delta[key][col] for col in base.columns] for key in keys], dtype=np.int64)
+    positions = base.index.get_indexer(keys)
+    known = positions >= 0
+
+    values = base.to_numpy(dtype=np.int64, copy=True)
+    values[positions[known]] += change[known]
+    new_keys = pd.Index([key for key, k in zip(keys, known) if not k], dtype=object, name=base.index.name)
+    values = np.vstack([values, change[~known]])
+    # append 会重新推断类型 (pandas 3 可能得到 str)，保持与整表构建相同的 object 索引
+    index = base.index.append(new_keys).astype(base.index.dtype)
+
+    # 计数全部归零的行 (例如某角色唯一的一局被改掉) 直接去掉，与整表重算的结果一致
+    keep = (values != 0).any(axis=1)
+    table = pd.DataFrame(values[keep], index=index[keep], columns=base.columns)
+    # 新出现的键按整表构建时的顺序 (groupby 排序) 插入
+    return table.sort_index() if len(new_keys) else table
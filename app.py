@@ -1,41 +1,54 @@
 ﻿import streamlit as st
-from streamlit_gsheets import GSheetsConnection
 import pandas as pd
 
+from aggregates import Aggregates
+from data_cache import get_data_cache
+import perf
+from scoring import score_match
+import stats
+from standings import compute_standings
+from storage import SQLiteStorage, SyncError, get_storage
+
+# 只有某个页面或管理员写入时才用到的模块 (批量导入、历史索引、等级分、对战矩阵)
+# 在对应的 render_* 函数里导入，只打开积分榜的访客不加载
+
 # ==============================================================================
 # 0. 基础配置
 # ==============================================================================
 st.set_page_config(page_title="SF6 SFL Manager", layout="wide")
 st.title("ZJU SFL Beta")
 
-# 建立连接
-conn = st.connection("gsheets", type=GSheetsConnection)
+# 建立连接 (存储后端见 storage.py，默认 Google Sheet)
+storage = get_storage()
+data_cache = get_data_cache(storage)
+# 后台写入队列 (secrets 中 write_behind = true 时)：Google Sheet 本身，或 SQLite 的同步目标
+write_queue = next((s for s in (storage, getattr(storage, "sync_target", None))
+                    if s is not None and s.write_behind), None)
 
 # ==============================================================================
 # 1. 数据加载与预处理
 # ==============================================================================
 def load_data():
-    # 强制不缓存，确保读取最新数据
-    df_s = conn.read(worksheet="schedule", ttl=0)
-    df_l = conn.read(worksheet="matchlogs", ttl=0)
-    df_c = conn.read(worksheet="configs", ttl=0)
-    return df_s, df_l, df_c
+    # 共享缓存：修订号未变化时直接复用内存中的数据，录入后显式失效
+    with perf.span("load_data"):
+        return data_cache.get()
+
+def update_cache(results, revisions):
+    # 写入成功后给共享缓存打补丁 (物化统计表按差量更新)；
+    # 打补丁失败时让缓存整体失效，下一次读取重新加载，不影响已完成的写入
+    try:
+        data_cache.apply_matches(results, revisions)
+    except Exception:
+        data_cache.invalidate()
 
 try:
-    df_schedule, df_logs, df_config = load_data()
-    
-    # --- 核心逻辑更新：构建 Team -> Players 的映射字典 ---
-    # 假设 configs 表 A列是 Team, B列是 Player
-    # 数据清洗：去空值
-    valid_config = df_config.dropna(subset=['Team', 'Player'])
-    
-    # 制作字典: {'Team Beast': ['Daigo', 'Fuudo'], 'Team Liquid': ['Nemo', ...]}
-    team_player_map = valid_config.groupby('Team')['Player'].apply(list).to_dict()
-    
-    # 制作角色列表 (C列)
-    chars_list = df_config['Character'].dropna().unique().tolist()
-    if not chars_list: # 如果没读到，给默认值防止报错
-        chars_list = ["Luke", "Ken", "Ryu", "Chun-Li", "Guile", "JP", "Juri", "Dee Jay", "Cammy", "Zangief", "Marisa", "Manon", "Lily", "Blanka", "Dhalsim", "E. Honda", "Jamie", "Kimberly", "Rashid", "A.K.I.", "Ed", "Akuma", "M. Bison", "Terry", "Mai","C.viper", "Sagat",]
+    snapshot = load_data()
+    df_schedule, df_logs = snapshot.schedule, snapshot.logs
+
+    # --- Team -> Players 的映射字典和角色列表 ---
+    # 加载数据时整理一次 (configs 没有变化时直接来自本地配置快照，见 config_snapshot.py)
+    config = snapshot.config
+    team_player_map, chars_list = config.team_player_map, config.chars_list
 
 except Exception as e:
     st.error(f"数据加载失败，请检查 Google Sheet 的 configs 表格式是否正确 (A列Team, B列Player)。报错信息: {e}")
@@ -57,15 +70,77 @@ with st.sidebar:
         st.warning("⚠️ 未设置密码，默认开放 (调试模式)")
         is_admin = True
 
+    # 性能面板：各热点路径最近 500 次的耗时分位数 + Google Sheets API 调用次数 (见 perf.py)
+    if is_admin:
+        with st.expander("⏱️ 性能面板"):
+            st.caption(f"数据版本 v{snapshot.version}，加载于 {pd.Timestamp(snapshot.loaded_at, unit='s'):%H:%M:%S} (UTC)")
+            for name, seconds in snapshot.load_timings.items():
+                st.text(f"{name:<10} {seconds * 1000:8.0f} ms")
+
+            perf_summary = perf.summary()
+            if perf_summary:
+                st.dataframe(pd.DataFrame(perf_summary).set_index("name"), use_container_width=True)
+
+            # HTTP 请求数在 gspread 层统计，可与 Sheets / Drive API 配额对照；
+            # 操作数是本 app 调用读写函数的次数，一次操作通常包含多次 HTTP 请求
+            counters = perf.counters()
+            for prefix, title in (("sheets_http.", "Google API HTTP 请求"), ("sheets_op.", "Google Sheet 读写操作")):
+                calls = {k[len(prefix):]: v for k, v in counters.items() if k.startswith(prefix)}
+                st.markdown(f"**{title}：{sum(calls.values())} 次** (进程启动以来)")
+                for name, n in sorted(calls.items()):
+                    st.text(f"{name:<20} {n:6d}")
+
+            st.download_button("导出日志 (JSON Lines)", perf.export_jsonl(), file_name="sfl_perf.jsonl",
+                               mime="application/json")
+
+    # 本地数据库模式：手动从 Google Sheet 重新拉取完整数据
+    if is_admin and isinstance(storage, SQLiteStorage) and storage.sync_target is not None:
+        if st.button("🔄 从 Google Sheet 重新同步"):
+            storage.import_from(storage.sync_target)
+            data_cache.invalidate()
+            st.rerun()
+
+    # 后台写入队列：尚未写入 Google Sheet 的比赛 (已保存在本地日志文件中，页面已显示新结果)
+    if is_admin and write_queue is not None:
+        pending = write_queue.pending()
+        if pending:
+            st.warning(f"⏳ {len(pending)} 场比赛等待写入{write_queue.label}: {', '.join(pending)}")
+            if write_queue.last_error:
+                st.caption(f"已失败 {write_queue.failures} 次，稍后自动重试。上次错误: {write_queue.last_error}")
+            # 连续失败多次的比赛已暂停自动重试 (见 write_queue.py)
+            retrying = write_queue.retrying()
+            parked = {key: entry for key, entry in pending.items() if key not in retrying}
+            for key, entry in parked.items():
+                st.error(f"{key} 已暂停写入: {entry.get('error')}")
+
+            if write_queue.last_error or parked:
+                discard_id = st.selectbox("待写入比赛", list(pending), key="write_queue_match")
+                col_retry, col_discard = st.columns(2)
+                if col_retry.button("立即重试"):
+                    write_queue.retry_now()
+                # 丢弃：该场不再写入，页面重新读取后显示表格中原有的数据
+                if col_discard.button("丢弃", type="secondary"):
+                    write_queue.discard(discard_id)
+                    data_cache.invalidate()
+                    st.rerun()
+
 # ==============================================================================
 # 3. 页面布局
 # ==============================================================================
-tab1, tab2, tab3, tab4 = st.tabs(["📝 比赛录入", "🏆 积分榜", "📊 数据统计", "📜 历史战报"])
+# 每个页面是一个 render_* 函数，每次 rerun 只执行当前选中的那一个
+# (st.tabs 会把四个页面全部计算一遍)，页面选择见文件末尾。
+
+def get_aggregates():
+    # 物化统计表：数据加载后构建一次，之后每次录入差量更新 (见 aggregates.py)
+    with perf.span("aggregates"):
+        return snapshot.derive("aggregates", lambda: Aggregates.build(df_schedule, df_logs))
 
 # ==============================================================================
 # TAB 1: 比赛录入 (核心功能) - UI 已优化
 # ==============================================================================
-with tab1:
+# fragment：切换场次、上传文件等操作只重跑录入页本身；提交成功后 st.rerun() 刷新整个页面
+@st.fragment
+def render_entry():
     if not is_admin:
         st.info("请在侧边栏输入密码以解锁录入功能。")
     else:
@@ -88,6 +163,8 @@ with tab1:
                 away_team = current_match['AwayTeam']
                 
                 st.info(f"🏟️ **{home_team}** (HOME) vs **{away_team}** (AWAY)")
+                if write_queue is not None and match_id in write_queue.pending():
+                    st.caption(f"⏳ 该场结果已保存，正在后台写入{write_queue.label}")
 
                 # --- 动态获取该战队的成员 ---
                 home_team_players = team_player_map.get(home_team, ["未在Config中找到该队成员"])
@@ -189,160 +266,127 @@ with tab1:
                     submitted = st.form_submit_button("💾 提交本场结果", type="primary")
 
                     if submitted:
-                        # 提交逻辑保持不变
-                        
-                        # 1. 简易积分计算
-                        h_total = 0
-                        a_total = 0
-                        
-                        # 记录每小局的胜者
-                        res_v = "Home" if v_sh > v_sa else "Away"
-                        res_c = "Home" if c_sh > c_sa else "Away"
-                        res_g = "Home" if g_sh > g_sa else "Away"
-                        
-                        # 算分
-                        if res_v == "Home": h_total += 10 
-                        else: a_total += 10
-                        
-                        if res_c == "Home": h_total += 10
-                        else: a_total += 10
-                        
-                        if res_g == "Home": h_total += 20
-                        else: a_total += 20
-                        
-                        # 检查是否加赛
-                        res_e = "None"
-                        if h_total == 20 and a_total == 20:
-                            # 20平，必须看加赛结果
-                            if e_sh > e_sa: 
-                                h_total += 10
-                                res_e = "Home"
-                            elif e_sa > e_sh: 
-                                a_total += 10
-                                res_e = "Away"
-                            else:
-                                st.error("比分 20-20，请录入加赛比分（不能是平局）！")
-                                st.stop()
-                        
-                        # 2. 准备写入数据 (覆盖旧记录)
-                        df_logs_cleaned = df_logs[df_logs['MatchID'] != match_id]
-                        
-                        new_rows = [
-                            # Vanguard
-                            {"MatchID": match_id, "Position": "Vanguard", "HomePlayer": v_hp, "HomeChar": v_hc, "AwayPlayer": v_ap, "AwayChar": v_ac, "Winner": res_v, "Score": f"{v_sh}-{v_sa}"},
-                            # Center
-                            {"MatchID": match_id, "Position": "Center", "HomePlayer": c_hp, "HomeChar": c_hc, "AwayPlayer": c_ap, "AwayChar": c_ac, "Winner": res_c, "Score": f"{c_sh}-{c_sa}"},
-                            # General
-                            {"MatchID": match_id, "Position": "General", "HomePlayer": g_hp, "HomeChar": g_hc, "AwayPlayer": g_ap, "AwayChar": g_ac, "Winner": res_g, "Score": f"{g_sh}-{g_sa}"},
+                        # 1. 计分 (规则见 scoring.py，与批量导入共用)
+                        battles = [
+                            {"Position": "Vanguard", "HomePlayer": v_hp, "HomeChar": v_hc, "AwayPlayer": v_ap, "AwayChar": v_ac, "Score": f"{v_sh}-{v_sa}"},
+                            {"Position": "Center", "HomePlayer": c_hp, "HomeChar": c_hc, "AwayPlayer": c_ap, "AwayChar": c_ac, "Score": f"{c_sh}-{c_sa}"},
+                            {"Position": "General", "HomePlayer": g_hp, "HomeChar": g_hc, "AwayPlayer": g_ap, "AwayChar": g_ac, "Score": f"{g_sh}-{g_sa}"},
+                            # 加赛栏总是带上，只有 20-20 时才会计入
+                            {"Position": "Extra", "HomePlayer": e_hp, "HomeChar": e_hc, "AwayPlayer": e_ap, "AwayChar": e_ac, "Score": f"{e_sh}-{e_sa}"},
                         ]
-                        
-                        if res_e != "None":
-                             new_rows.append({"MatchID": match_id, "Position": "Extra", "HomePlayer": e_hp, "HomeChar": e_hc, "AwayPlayer": e_ap, "AwayChar": e_ac, "Winner": res_e, "Score": f"{e_sh}-{e_sa}"})
-                             
-                        df_new_logs = pd.concat([df_logs_cleaned, pd.DataFrame(new_rows)], ignore_index=True)
-                        
-                        # 3. 更新 Schedule 表
-                        df_schedule.loc[df_schedule['MatchID'] == match_id, ['Status', 'HomeTotalPoints', 'AwayTotalPoints']] = ['Done', h_total, a_total]
-                        
-                        # 4. 执行写入
                         try:
-                            # 假设 conn.update 函数存在
-                            conn.update(worksheet="MatchLog", data=df_new_logs)
-                            conn.update(worksheet="Schedule", data=df_schedule)
-                            st.success(f"✅ 录入成功！{home_team} {h_total} - {a_total} {away_team}")
-                            st.cache_data.clear()
-                            st.rerun()
+                            # 2. 准备写入数据 (覆盖旧记录)
+                            new_rows, h_total, a_total = score_match(match_id, battles, drop_unused_extra=True)
+                        except ValueError as e:
+                            st.error(f"{e}，请检查比分后重新提交！")
+                            st.stop()
+
+                        # 3. 执行写入 (增量：只改动该场的 MatchLog 行和 Schedule 单元格)
+                        saved, sync_error = False, None
+                        try:
+                            with perf.span("tab1.save_match"):
+                                revisions = storage.save_match(match_id, new_rows, h_total, a_total)
+                            saved = True
+                        except SyncError as e:
+                            # 本地已写入，只是同步失败
+                            saved, sync_error, revisions = True, e, e.revisions
                         except Exception as e:
-                            st.error(f"写入 Google Sheet 失败: {e}")
+                            st.error(f"写入{storage.label}失败: {e}")
+
+                        if saved:
+                            update_cache([(match_id, new_rows, h_total, a_total)], revisions)
+                            if sync_error is not None:
+                                st.warning(str(sync_error))
+                            else:
+                                st.success(f"✅ 录入成功！{home_team} {h_total} - {a_total} {away_team}")
+                                st.rerun()
 
         except Exception as e:
             st.error(f"加载比赛列表时出错: {e}")
             st.code(e) # 打印错误方便调试
 
+        # --- 批量导入 (线下赛结束后一次录入多场) ---
+        with st.expander("📦 批量导入 (CSV / JSON)"):
+            st.caption(
+                "每行一局，列: MatchID, Position, HomePlayer, HomeChar, AwayPlayer, AwayChar, Score (如 2-1)。"
+                "按单场录入相同的规则计分，20-20 时必须包含 Extra 加赛。"
+            )
+            uploaded = st.file_uploader("选择文件", type=["csv", "json"], key="bulk_file")
+            if uploaded is not None:
+                from bulk_import import read_battles, validate_import
+
+                try:
+                    df_import = read_battles(uploaded)
+                    results, errors = validate_import(df_import, df_schedule, team_player_map, chars_list)
+                except Exception as e:
+                    st.error(f"文件解析失败: {e}")
+                    results, errors = [], []
+
+                if errors:
+                    st.error("以下比赛未通过校验，请修改文件后重新上传：")
+                    st.dataframe(pd.DataFrame(errors, columns=["MatchID", "问题"]), use_container_width=True, hide_index=True)
+                elif results:
+                    st.dataframe(
+                        pd.DataFrame([(m, h, a) for m, _, h, a in results], columns=["MatchID", "Home 总分", "Away 总分"]),
+                        use_container_width=True, hide_index=True,
+                    )
+                    if st.button(f"💾 确认导入 {len(results)} 场比赛", type="primary"):
+                        saved, sync_error = False, None
+                        try:
+                            # 所有场次合并成一次批量写入
+                            with perf.span("tab1.save_matches", matches=len(results)):
+                                revisions = storage.save_matches(results)
+                            saved = True
+                        except SyncError as e:
+                            saved, sync_error, revisions = True, e, e.revisions
+                        except Exception as e:
+                            st.error(f"写入{storage.label}失败: {e}")
+
+                        if saved:
+                            update_cache(results, revisions)
+                            if sync_error is not None:
+                                st.warning(str(sync_error))
+                            else:
+                                st.rerun()
+
 # ==============================================================================
 # TAB 2: 积分榜
 # ==============================================================================
-with tab2:
+def render_standings():
     st.header("🏆 实时积分榜")
     
-    # 简单的积分计算
-    teams = df_config['Team'].unique() if 'Team' in df_config.columns else []
+    teams = config.teams
     if len(teams) == 0:
         st.warning("configs 表中未找到 Team 列")
     else:
-        standings = []
-        for team in teams:
-            # 找到主场比赛
-            home_matches = df_schedule[(df_schedule['HomeTeam'] == team) & (df_schedule['Status'] == 'Done')]
-            home_pts = home_matches['HomeTotalPoints'].sum()
-            
-            # 找到客场比赛
-            away_matches = df_schedule[(df_schedule['AwayTeam'] == team) & (df_schedule['Status'] == 'Done')]
-            away_pts = away_matches['AwayTotalPoints'].sum()
-            
-            total_matches = len(home_matches) + len(away_matches)
-            
-            standings.append({
-                "Team": team,
-                "Points": home_pts + away_pts,
-                "Matches": total_matches
-            })
-            
-        df_rank = pd.DataFrame(standings).sort_values("Points", ascending=False).reset_index(drop=True)
+        # 直接读物化的队伍计数表，每个数据版本只排序一次
+        # (派生结果由所有会话共享，只读，不要原地修改)
+        aggregates = get_aggregates()
+        df_rank = snapshot.derive("standings", lambda: compute_standings(aggregates.teams, teams))
         # 索引从1开始
-        df_rank.index = df_rank.index + 1
+        df_rank = df_rank.set_axis(df_rank.index + 1)
         st.dataframe(df_rank, use_container_width=True)
 
 # ==============================================================================
 # TAB 3: 数据统计
 # ==============================================================================
-# 辅助函数：根据对局位置确定获胜得分
-def get_battle_points(position):
-    if position == 'Vanguard': return 10
-    if position == 'Center': return 10
-    if position == 'General': return 20
-    if position == 'Extra': return 10
-    return 0
-
-with tab3:
+def render_stats():
     st.header("📊 数据统计")
     if not df_logs.empty:
         
-        # --- 0. 数据预处理 (将 Home 和 Away 的数据合并到一起) ---
-        
-        # 0a. Home 侧数据处理
-        df_home = df_logs[['HomePlayer', 'HomeChar', 'Position', 'Winner']].rename(
-            columns={'HomePlayer': 'Player', 'HomeChar': 'Character'}
-        )
-        df_home['IsWin'] = df_home['Winner'] == 'Home'
-        df_home['Points'] = df_home.apply(lambda row: get_battle_points(row['Position']) if row['IsWin'] else 0, axis=1)
-
-        # 0b. Away 侧数据处理
-        df_away = df_logs[['AwayPlayer', 'AwayChar', 'Position', 'Winner']].rename(
-            columns={'AwayPlayer': 'Player', 'AwayChar': 'Character'}
-        )
-        df_away['IsWin'] = df_away['Winner'] == 'Away'
-        df_away['Points'] = df_away.apply(lambda row: get_battle_points(row['Position']) if row['IsWin'] else 0, axis=1)
-
-        # 0c. 合并数据并清洗 (过滤掉 Extra Match 里 "无" 的情况)
-        df_combined = pd.concat([df_home, df_away], ignore_index=True)
-        df_combined = df_combined[df_combined['Character'] != '无']
-
+        # 角色 / 选手 / 位置统计都直接读物化的计数表 (aggregates)
+        aggregates = get_aggregates()
         
         # --- 1. 角色统计 (角色胜率和得分) ---
         st.subheader("角色表现分析")
         col1, col2 = st.columns(2)
         
-        char_stats = df_combined.groupby('Character').agg(
-            Total_Battles=('Player', 'size'),
-            Wins=('IsWin', 'sum'),
-            Total_Points=('Points', 'sum')
-        ).reset_index()
-        
-        char_stats['Win Rate'] = (char_stats['Wins'] / char_stats['Total_Battles']).map('{:.1%}'.format)
+        char_stats = snapshot.derive("character_stats", lambda: stats.with_win_rate(aggregates.characters))
         
         # 格式化和排序
-        char_stats_display = char_stats.sort_values('Total_Points', ascending=False).rename(
+        char_stats_display = char_stats.sort_values('Total_Points', ascending=False).assign(
+            **{'Win Rate': char_stats['Win Rate'].map('{:.1%}'.format)}
+        ).rename(
             columns={'Character': '角色', 'Total_Battles': '总场次', 'Wins': '胜场', 'Total_Points': '总得分', 'Win Rate': '胜率'}
         )
         
@@ -360,15 +404,12 @@ with tab3:
         # --- 2. 选手个人胜率 (Player Stats) ---
         st.subheader("选手胜率")
         
-        player_stats = df_combined.groupby('Player').agg(
-            Total_Battles=('Character', 'size'),
-            Wins=('IsWin', 'sum')
-        ).reset_index()
-        
-        player_stats['Win Rate'] = (player_stats['Wins'] / player_stats['Total_Battles']).map('{:.1%}'.format)
+        player_stats = snapshot.derive("player_stats", lambda: stats.with_win_rate(aggregates.players))
         
         # 格式化和排序 (按胜率降序)
-        player_stats_display = player_stats.sort_values('Win Rate', ascending=False).rename(
+        player_stats_display = player_stats.sort_values('Win Rate', ascending=False).assign(
+            **{'Win Rate': player_stats['Win Rate'].map('{:.1%}'.format)}
+        ).rename(
             columns={'Player': '选手', 'Total_Battles': '总场次', 'Wins': '胜场', 'Win Rate': '胜率'}
         )
 
@@ -377,24 +418,32 @@ with tab3:
 
         st.divider()
 
-        # --- 3. 对局位置分析 (原始代码保留，稍作优化) ---
-        st.subheader("对局位置胜率")
-        
-        position_wins = df_logs.groupby('Position')['Winner'].value_counts().unstack(fill_value=0)
-        
-        # 避免只有一侧数据时报错
-        home_col = 'Home' if 'Home' in position_wins.columns else 0
-        away_col = 'Away' if 'Away' in position_wins.columns else 0
+        # --- 3. 等级分 (Elo，按 MatchID 自然排序逐局计算，见 ratings.py) ---
+        st.subheader("等级分 (Elo)")
+        st.caption("初始 1500 分，大将战权重加倍。相比胜率，对出场次数少的选手更公平。")
 
-        position_wins['Total'] = position_wins[home_col] + position_wins[away_col]
+        # 录入时在共享缓存中增量更新，只有覆盖旧比赛时才从最近的检查点重放
+        from ratings import Ratings
+
+        ratings = snapshot.derive("ratings", lambda: Ratings.build(df_logs))
+        rating_cols = {'Player': '选手', 'Character': '角色', 'Rating': '等级分', 'Battles': '局数'}
+        col1, col2 = st.columns(2)
+        with col1:
+            st.markdown("##### 选手")
+            st.dataframe(ratings.player_table().rename(columns=rating_cols), use_container_width=True, hide_index=True)
+        with col2:
+            st.markdown("##### 角色")
+            st.dataframe(ratings.character_table().rename(columns=rating_cols), use_container_width=True, hide_index=True)
+
+        st.divider()
+
+        # --- 4. 对局位置分析 ---
+        st.subheader("对局位置胜率")
         
-        # 确保分母不为零
-        if (position_wins['Total'] > 0).any():
-            position_wins['Home Win %'] = (position_wins[home_col] / position_wins['Total']).map('{:.1%}'.format)
-        else:
-            position_wins['Home Win %'] = '0.0%'
-            
-        position_wins = position_wins.rename(columns={home_col: '主场胜', away_col: '客场胜', 'Total': '总局数'})
+        position_wins = snapshot.derive("position_stats", lambda: stats.position_stats(aggregates.positions))
+        position_wins = position_wins.assign(
+            **{'Home Win %': position_wins['Home Win %'].map('{:.1%}'.format)}
+        ).rename(columns={'Home': '主场胜', 'Away': '客场胜', 'Total': '总局数'})
         
         # 只显示需要的列
         st.dataframe(position_wins[['主场胜', '客场胜', '总局数', 'Home Win %']], use_container_width=True)
@@ -405,28 +454,103 @@ with tab3:
 # ==============================================================================
 # TAB 4: 历史战报
 # ==============================================================================
-with tab4:
+def render_history():
+    from history_index import SORT_ORDERS, HistoryIndex
+
     st.header("📜 历史对局查询")
     
     # 简单展示日志
     if not df_logs.empty:
-        # 增加筛选功能
-        filter_team = st.selectbox("筛选队伍", ["All"] + list(team_player_map.keys()))
-        
-        display_df = df_logs.copy()
-        
-        if filter_team != "All":
-            # 这里逻辑稍微复杂，因为Log里没有队伍名。
-            # 简单做法：先去schedule找这个队打过的MatchID
-            team_match_ids = df_schedule[
-                (df_schedule['HomeTeam'] == filter_team) | (df_schedule['AwayTeam'] == filter_team)
-            ]['MatchID'].unique()
-            display_df = display_df[display_df['MatchID'].isin(team_match_ids)]
-            
+        # 增加筛选功能 (队伍 / 选手 / 角色 -> 行号 的索引，每个数据版本只建一次)
+        history = snapshot.derive("history_index", lambda: HistoryIndex(df_schedule, df_logs))
+
+        f1, f2, f3 = st.columns(3)
+        filter_team = f1.selectbox("筛选队伍", ["All"] + list(team_player_map.keys()))
+        filter_player = f2.selectbox("筛选选手", ["All"] + history.players)
+        filter_char = f3.selectbox("筛选角色", ["All"] + history.characters)
+
+        rows = history.filter_rows(
+            team=None if filter_team == "All" else filter_team,
+            player=None if filter_player == "All" else filter_player,
+            character=None if filter_char == "All" else filter_char,
+        )
+
+        # 服务端排序 + 分页：只把当前页的几十行发给浏览器
+        p1, p2, p3 = st.columns([2, 1, 1])
+        sort_order = p1.selectbox("排序", SORT_ORDERS)
+        page_size = p2.selectbox("每页条数", [20, 50, 100])
+        rows = history.sorted_rows(rows, sort_order)
+        n_pages = max(1, -(-len(rows) // page_size))
+        page = p3.number_input("页码", min_value=1, max_value=n_pages, value=1)
+
+        page_rows = rows[(page - 1) * page_size: page * page_size]
         st.dataframe(
-            display_df[['MatchID', 'Position', 'HomePlayer', 'Score', 'AwayPlayer', 'Winner']], 
+            df_logs.iloc[page_rows][['MatchID', 'Position', 'HomePlayer', 'HomeChar', 'Score', 'AwayChar', 'AwayPlayer', 'Winner']],
             use_container_width=True,
             hide_index=True
         )
+        st.caption(f"共 {len(rows)} 条记录，第 {page} / {n_pages} 页")
     else:
-        st.info("暂无记录")
\ No newline at end of file
+        st.info("暂无记录")
+
+# ==============================================================================
+# TAB 5: 对战矩阵
+# ==============================================================================
+def render_matchups():
+    st.header("⚔️ 对战矩阵")
+    if df_logs.empty:
+        st.info("暂无数据")
+        return
+
+    # 选手 / 角色两两之间的胜负计数 (整数矩阵)，录入时差量更新，见 matchups.py
+    from history_index import HistoryIndex
+    from matchups import Matchups
+
+    matchups = snapshot.derive("matchups", lambda: Matchups.build(df_logs))
+    kind = st.radio("类型", ["选手", "角色"], horizontal=True, key="matchup_kind")
+    matrix = matchups.players if kind == "选手" else matchups.characters
+
+    names = matrix.active_names()
+    if not names:
+        st.info("暂无数据")
+        return
+    focus = st.selectbox(f"选择{kind}", names, key="matchup_focus")
+    record = matrix.record(focus)
+    st.dataframe(
+        record.assign(**{'Win Rate': record['Win Rate'].map('{:.1%}'.format)}).rename(
+            columns={'Opponent': '对手', 'Battles': '交手局数', 'Wins': '胜', 'Losses': '负', 'Win Rate': '胜率'}
+        ),
+        use_container_width=True, hide_index=True,
+    )
+
+    # 按需展开：选中对手后才通过历史战报索引取出双方的每一局
+    opponent = st.selectbox("查看与该对手的全部对局", ["—"] + record['Opponent'].tolist(), key="matchup_opponent")
+    if opponent != "—":
+        history = snapshot.derive("history_index", lambda: HistoryIndex(df_schedule, df_logs))
+        rows = history.sorted_rows(history.versus_rows(focus, opponent, characters=(kind == "角色")))
+        st.dataframe(
+            df_logs.iloc[rows][['MatchID', 'Position', 'HomePlayer', 'HomeChar', 'Score', 'AwayChar', 'AwayPlayer', 'Winner']],
+            use_container_width=True, hide_index=True,
+        )
+
+    if st.checkbox("显示完整矩阵", key="matchup_full"):
+        rate, games = matrix.frame()
+        st.caption("行对列的胜率，括号内为交手局数")
+        cells = rate.map('{:.0%}'.format).where(games > 0, "") + games.map(' ({})'.format).where(games > 0, "")
+        st.dataframe(cells, use_container_width=True)
+
+# ==============================================================================
+# 页面选择：只渲染当前页面
+# ==============================================================================
+VIEWS = {
+    "📝 比赛录入": ("tab1.entry", render_entry),
+    "🏆 积分榜": ("tab2.standings", render_standings),
+    "📊 数据统计": ("tab3.stats", render_stats),
+    "⚔️ 对战矩阵": ("tab5.matchups", render_matchups),
+    "📜 历史战报": ("tab4.history", render_history),
+}
+
+view = st.radio("页面", list(VIEWS), horizontal=True, label_visibility="collapsed", key="view")
+span_name, render_view = VIEWS[view]
+with perf.span(span_name):
+    render_view()
\ No newline at end of file
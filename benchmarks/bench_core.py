@@ -0,0 +1,173 @@
+import argparse
+import random
+import statistics
+import sys
+import time
+
+import pandas as pd
+
+import stats
+from aggregates import Aggregates
+from history_index import HistoryIndex
+from matchups import Matchups
+from ratings import Ratings
+from scoring import MAX_SCORE, score_match
+from standings import compute_standings
+
+# ==============================================================================
+# 核心计算的性能基准 (不依赖 Streamlit / Google Sheet)
+# ==============================================================================
+# 生成一个虚拟联赛 (默认 64 支队伍、10000 场比赛)，测量积分榜、角色统计、
+# 历史战报筛选等热点路径的耗时。赛季开始前在仓库根目录运行：
+#
+#   python -m benchmarks.bench_core
+#   python -m benchmarks.bench_core --teams 128 --matches 50000 --check
+#
+# --check：任一项的中位数超过 BUDGET_MS 中的预算时以非 0 状态退出，用于发现性能回退。
+
+# 各项的耗时预算 (毫秒，默认规模 64 队 / 10000 场)
+BUDGET_MS = {
+    "aggregates.build": 1500,
+    "standings": 20,
+    "character_stats": 20,
+    "player_stats": 20,
+    "history_index.build": 1500,
+    "history.filter_team": 5,
+    "history.filter_player_char": 5,
+    "history.sorted_page": 20,
+    # 差量更新只处理一场比赛的几行数据 (纯 Python 计数 + 小数组相加)，不随历史数据增长
+    "aggregates.replace_match": 20,
+    "matchups.build": 500,
+    "matchups.replace_match": 20,
+    "ratings.build": 1000,
+    "ratings.append_match": 5,
+    # 覆盖中间的一场：该场之后的一半比赛需要重放
+    "ratings.replace_past_match": 100,
+}
+
+CHARACTERS = ["Luke", "Ken", "Ryu", "Chun-Li", "Guile", "JP", "Juri", "Dee Jay", "Cammy", "Zangief",
+              "Marisa", "Manon", "Lily", "Blanka", "Dhalsim", "E. Honda", "Jamie", "Kimberly", "Rashid",
+              "A.K.I.", "Ed", "Akuma", "M. Bison", "Terry", "Mai", "C.viper", "Sagat"]
+
+
+def _random_score(rng, position):
+    # 随机一方拿满胜局，另一方拿 0 ~ 上限-1
+    top = MAX_SCORE[position]
+    loser = rng.randrange(top)
+    return f"{top}-{loser}" if rng.random() < 0.5 else f"{loser}-{top}"
+
+
+def make_league(n_teams=64, n_matches=10000, players_per_team=4, seed=0):
+    # 返回 (df_schedule, df_logs, df_config)，比分全部经过 scoring.score_match 计分
+    rng = random.Random(seed)
+    teams = [f"Team {i:03d}" for i in range(n_teams)]
+    roster = {team: [f"{team} P{j}" for j in range(players_per_team)] for team in teams}
+    config = pd.DataFrame(
+        [(team, player, rng.choice(CHARACTERS)) for team in teams for player in roster[team]],
+        columns=["Team", "Player", "Character"],
+    )
+
+    schedule, logs = [], []
+    for n in range(n_matches):
+        match_id = f"M{n:06d}"
+        home, away = rng.sample(teams, 2)
+        battles = []
+        for position in ("Vanguard", "Center", "General", "Extra"):
+            battles.append({
+                "Position": position,
+                "HomePlayer": rng.choice(roster[home]), "HomeChar": rng.choice(CHARACTERS),
+                "AwayPlayer": rng.choice(roster[away]), "AwayChar": rng.choice(CHARACTERS),
+                "Score": _random_score(rng, position),
+            })
+        rows, h_total, a_total = score_match(match_id, battles, drop_unused_extra=True)
+        schedule.append((match_id, home, away, "Done", h_total, a_total))
+        logs.extend(rows)
+
+    df_schedule = pd.DataFrame(schedule, columns=["MatchID", "HomeTeam", "AwayTeam", "Status",
+                                                  "HomeTotalPoints", "AwayTotalPoints"])
+    return df_schedule, pd.DataFrame(logs), config
+
+
+def _time(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples), min(samples)
+
+
+def run(n_teams, n_matches, repeat):
+    print(f"生成虚拟联赛: {n_teams} 支队伍, {n_matches} 场比赛 ...")
+    df_schedule, df_logs, df_config = make_league(n_teams, n_matches)
+    teams = df_config["Team"].unique()
+    print(f"matchlogs {len(df_logs)} 行\n")
+
+    aggregates = Aggregates.build(df_schedule, df_logs)
+    history = HistoryIndex(df_schedule, df_logs)
+    ratings = Ratings.build(df_logs)
+    matchups = Matchups.build(df_logs)
+    team, player, character = teams[0], history.players[0], history.characters[0]
+
+    # 重新提交最后一场比赛 (把结果反过来)，测量差量更新
+    last_id = df_schedule["MatchID"].iloc[-1]
+    old_schedule = df_schedule[df_schedule["MatchID"] == last_id]
+    old_logs = df_logs[df_logs["MatchID"] == last_id]
+    new_logs = old_logs.assign(Winner=old_logs["Winner"].map({"Home": "Away", "Away": "Home"}))
+    new_schedule = old_schedule.assign(HomeTotalPoints=old_schedule["AwayTotalPoints"],
+                                       AwayTotalPoints=old_schedule["HomeTotalPoints"])
+
+    # 等级分：最后一场当作新录入 (在之前的结果上接着算) / 覆盖中间的一场 (从检查点重放)
+    ratings_before_last = ratings.replace_match(old_schedule, old_logs, old_schedule, old_logs.iloc[:0])
+    mid_id = df_schedule["MatchID"].iloc[len(df_schedule) // 2]
+    mid_schedule = df_schedule[df_schedule["MatchID"] == mid_id]
+    mid_logs = df_logs[df_logs["MatchID"] == mid_id]
+
+    cases = {
+        "aggregates.build": lambda: Aggregates.build(df_schedule, df_logs),
+        "standings": lambda: compute_standings(aggregates.teams, teams),
+        "character_stats": lambda: stats.with_win_rate(aggregates.characters),
+        "player_stats": lambda: stats.with_win_rate(aggregates.players),
+        "history_index.build": lambda: HistoryIndex(df_schedule, df_logs),
+        "history.filter_team": lambda: history.filter_rows(team=team),
+        "history.filter_player_char": lambda: history.filter_rows(player=player, character=character),
+        "history.sorted_page": lambda: df_logs.iloc[history.sorted_rows(history.filter_rows(team=team))[:50]],
+        "aggregates.replace_match": lambda: aggregates.replace_match(old_schedule, old_logs,
+                                                                     new_schedule, new_logs),
+        "matchups.build": lambda: Matchups.build(df_logs),
+        "matchups.replace_match": lambda: matchups.replace_match(old_schedule, old_logs, new_schedule, new_logs),
+        "ratings.build": lambda: Ratings.build(df_logs),
+        "ratings.append_match": lambda: ratings_before_last.replace_match(old_schedule.iloc[:0], old_logs.iloc[:0],
+                                                                          new_schedule, new_logs),
+        "ratings.replace_past_match": lambda: ratings.replace_match(mid_schedule, mid_logs,
+                                                                    mid_schedule, mid_logs.iloc[::-1]),
+    }
+
+    over_budget = []
+    print(f"{'case':<30}{'median ms':>12}{'min ms':>10}{'budget':>10}")
+    for name, fn in cases.items():
+        median, best = _time(fn, repeat)
+        budget = BUDGET_MS[name]
+        flag = "" if median <= budget else "  <-- 超出预算"
+        if flag:
+            over_budget.append(name)
+        print(f"{name:<30}{median:>12.2f}{best:>10.2f}{budget:>10}{flag}")
+    return over_budget
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SFL 核心计算性能基准")
+    parser.add_argument("--teams", type=int, default=64)
+    parser.add_argument("--matches", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--check", action="store_true", help="超出预算时以非 0 状态退出")
+    args = parser.parse_args()
+
+    over_budget = run(args.teams, args.matches, args.repeat)
+    if args.check and over_budget:
+        print(f"\n超出预算: {', '.join(over_budget)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
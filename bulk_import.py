@@ -0,0 +1,65 @@
+import json
+
+import pandas as pd
+
+from scoring import score_match
+
+# ==============================================================================
+# 批量导入比赛结果 (纯 pandas，不依赖 Streamlit)
+# ==============================================================================
+# 线下赛结束后一次导入多场比赛。文件为 CSV 或 JSON (对象数组)，每行一局：
+#
+#   MatchID, Position, HomePlayer, HomeChar, AwayPlayer, AwayChar, Score
+#   M01,     Vanguard, Daigo,      Ryu,      Nemo,       Ken,      2-1
+#
+# 每场比赛按与单场录入相同的规则校验和计分 (scoring.score_match)：
+# 先锋 10 / 中坚 10 / 大将 20，20-20 平局时必须有加赛 (10 分) 决出胜负。
+
+IMPORT_COLUMNS = ["MatchID", "Position", "HomePlayer", "HomeChar", "AwayPlayer", "AwayChar", "Score"]
+
+
+def read_battles(uploaded_file):
+    if uploaded_file.name.lower().endswith(".json"):
+        data = json.load(uploaded_file)
+        if isinstance(data, dict):
+            data = data.get("battles", [])
+        df = pd.DataFrame(data, dtype=str)
+    else:
+        df = pd.read_csv(uploaded_file, dtype=str)
+
+    missing = [col for col in IMPORT_COLUMNS if col not in df.columns]
+    if missing:
+        raise ValueError(f"缺少列: {', '.join(missing)}")
+    return df[IMPORT_COLUMNS].fillna("").apply(lambda col: col.str.strip())
+
+
+def validate_import(df_battles, df_schedule, team_player_map=None, chars_list=None):
+    # 返回 (results, errors)
+    #   results: [(match_id, rows, h_total, a_total), ...]，可直接交给 Storage.save_matches
+    #   errors:  [(match_id, 错误信息), ...]
+    schedule = df_schedule.set_index(df_schedule["MatchID"].astype(str))
+    results, errors = [], []
+
+    for match_id, group in df_battles.groupby("MatchID", sort=False):
+        if match_id not in schedule.index:
+            errors.append((match_id, "Schedule 表中不存在该场比赛"))
+            continue
+        battles = group.to_dict("records")
+
+        home_team, away_team = schedule.loc[match_id, ["HomeTeam", "AwayTeam"]]
+        problems = []
+        for battle in battles:
+            for side, team in (("Home", home_team), ("Away", away_team)):
+                player, char = battle[f"{side}Player"], battle[f"{side}Char"]
+                if team_player_map and player not in team_player_map.get(team, []):
+                    problems.append(f"{battle['Position']}: {player} 不是 {team} 的成员")
+                if chars_list and char not in chars_list:
+                    problems.append(f"{battle['Position']}: 未知角色 {char}")
+        try:
+            if problems:
+                raise ValueError("；".join(problems))
+            results.append((match_id, *score_match(match_id, battles)))
+        except ValueError as e:
+            errors.append((match_id, str(e)))
+
+    return results, errors
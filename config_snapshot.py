@@ -0,0 +1,83 @@
+import json
+import os
+
+# ==============================================================================
+# 配置快照 (队伍列表、队伍 -> 选手、角色列表)
+# ==============================================================================
+# configs 表 (A列 Team, B列 Player, C列 Character) 很少变化。整理后的结果连同整理时的
+# 数据修订号保存在本地小文件里。共享缓存重新加载时先读这个文件：修订号与存储后端当前的
+# 修订号相同，说明表格自那以后没有改动过，只下载 schedule / matchlogs 两张表 (见 DataCache._reload)。
+# 录入比赛只改 schedule / matchlogs，本进程写入后的修订号也记到文件里 (restamped)，
+# 重启后仍然可以跳过 configs。
+# 队伍名可能是数字，JSON 对象的键只能是字符串，所以队伍 -> 选手按 [队伍, [选手, ...]] 的列表保存。
+
+CONFIG_SNAPSHOT_PATH = "sfl_config.json"
+
+# configs 表里没有角色时的默认列表
+DEFAULT_CHARACTERS = ["Luke", "Ken", "Ryu", "Chun-Li", "Guile", "JP", "Juri", "Dee Jay", "Cammy", "Zangief",
+                      "Marisa", "Manon", "Lily", "Blanka", "Dhalsim", "E. Honda", "Jamie", "Kimberly", "Rashid",
+                      "A.K.I.", "Ed", "Akuma", "M. Bison", "Terry", "Mai", "C.viper", "Sagat"]
+
+
+def _plain(value):
+    # numpy 标量 -> Python 值，写入 JSON 再读回后类型不变
+    return value.item() if hasattr(value, "item") else value
+
+
+class ConfigSnapshot:
+    def __init__(self, revision, teams, team_player_map, chars_list):
+        self.revision = revision                # 整理时的数据修订号 (见 Storage.revision)
+        self.teams = teams                      # configs 登记的全部队伍，保持表内顺序
+        self.team_player_map = team_player_map  # {'Team Beast': ['Daigo', 'Fuudo'], ...}
+        self.chars_list = chars_list
+
+    @classmethod
+    def build(cls, df_config, revision=None):
+        # 数据清洗：去空值 (缺少 Team / Player 列时抛出 KeyError，由页面提示检查 configs 表)
+        valid_config = df_config.dropna(subset=['Team', 'Player'])
+        team_player_map = {
+            _plain(team): [_plain(player) for player in players]
+            for team, players in valid_config.groupby('Team')['Player'].apply(list).items()
+        }
+        teams = [_plain(team) for team in df_config['Team'].dropna().unique()]
+        chars_list = [_plain(c) for c in df_config['Character'].dropna().unique()] or list(DEFAULT_CHARACTERS)
+        return cls(revision, teams, team_player_map, chars_list)
+
+    @classmethod
+    def read(cls, path, revision):
+        # 文件里的修订号与 revision 相同时返回快照；没有文件、文件损坏或修订号不同时返回 None
+        if path is None or revision is None:
+            return None
+        try:
+            with open(path, encoding="utf-8") as f:
+                data = json.load(f)
+            if data["revision"] != revision:
+                return None
+            team_player_map = {team: players for team, players in data["team_players"]}
+            return cls(revision, data["teams"], team_player_map, data["characters"])
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+    def save(self, path):
+        if path is None or self.revision is None:
+            return
+        data = {
+            "revision": self.revision,
+            "teams": self.teams,
+            "team_players": [[team, players] for team, players in self.team_player_map.items()],
+            "characters": self.chars_list,
+        }
+        tmp = f"{path}.tmp"
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False)
+            os.replace(tmp, path)
+        except (OSError, TypeError):
+            # 快照只是启动优化，只读文件系统、无法写入 JSON 的值等情况下直接跳过
+            pass
+
+    def restamped(self, revision, path):
+        # 本进程写入比赛结果后调用：configs 没有变化，只更新修订号并写回文件
+        snapshot = ConfigSnapshot(revision, self.teams, self.team_player_map, self.chars_list)
+        snapshot.save(path)
+        return snapshot
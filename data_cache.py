@@ -0,0 +1,218 @@
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+import perf
+from config_snapshot import ConfigSnapshot
+
+# ==============================================================================
+# 共享数据缓存 (所有会话共用一份 schedule / matchlogs / configs)
+# ==============================================================================
+# 思路：
+#   1. 三张表只在进程内保存一份 (st.cache_resource)，不再每次 rerun 都整表下载；
+#   2. 每隔 check_interval 秒向存储后端做一次廉价的"修订号"检查
+#      (Google Sheet 用 Drive 的 modifiedTime，SQLite 用 meta 表里的计数)，
+#      修订号变化才重新拉取整表，保证页面数据不过期；
+#   3. 录入成功后由写入方调用 apply_matches() 直接在内存中打补丁 (不重新下载整表)，
+#      或调用 invalidate()，下一次读取立即重新加载；
+#   4. configs 整理成 ConfigSnapshot 保存在本地文件里，修订号没变时重新加载不再下载 configs
+#      (见 config_snapshot.py)。
+
+# 两次修订号检查之间的最小间隔 (秒)
+CHECK_INTERVAL = 10
+# 拿不到修订号时 (例如公开链接模式) 的最长缓存时间 (秒)
+MAX_AGE_WITHOUT_REVISION = 30
+
+
+class DataSnapshot:
+    """某一版本的 schedule / matchlogs、整理后的 configs (ConfigSnapshot)，以及基于该版本计算出的派生数据。"""
+
+    def __init__(self, version, revision, schedule, logs, config, load_timings=None):
+        self.version = version
+        self.revision = revision
+        self.schedule = schedule
+        self.logs = logs
+        self.config = config
+        self.loaded_at = time.time()
+        # 每张表的读取耗时 + 总耗时 (秒)，例如 {"schedule": 0.8, ..., "total": 1.1}
+        self.load_timings = load_timings or {}
+        self._derived = {}
+        self._lock = threading.Lock()
+
+    def derive(self, key, builder):
+        # 同一版本的派生结果 (统计表、积分榜等) 只计算一次，所有会话共享
+        with self._lock:
+            if key in self._derived:
+                return self._derived[key]
+        value = builder()
+        with self._lock:
+            return self._derived.setdefault(key, value)
+
+
+class DataCache:
+    def __init__(self, loader, revision_fn=None, check_interval=CHECK_INTERVAL,
+                 max_age=MAX_AGE_WITHOUT_REVISION, config_path=None):
+        # loader(skip_config=False) -> ((df_schedule, df_logs, df_config), load_timings)，跳过时 df_config 为 None
+        # revision_fn() -> 任意可比较的修订标记；返回 None 表示无法获取
+        # config_path：配置快照文件，None 表示不保存 (每次重新加载都读取 configs)
+        self._loader = loader
+        self._revision_fn = revision_fn
+        self.config_path = config_path
+        self.check_interval = check_interval
+        self.max_age = max_age
+
+        self._lock = threading.Lock()
+        self._snapshot = None
+        self._stale = True
+        self._version = 0
+        self._checked_at = 0.0
+
+    def get(self):
+        # 加锁保证同一时间只有一个会话在拉取整表，其余会话等待后直接复用结果
+        with self._lock:
+            now = time.monotonic()
+            if self._snapshot is None or self._stale:
+                return self._reload(self._current_revision())
+
+            if now - self._checked_at < self.check_interval:
+                return self._snapshot
+            self._checked_at = now
+
+            revision = self._current_revision()
+            if revision is None:
+                if time.time() - self._snapshot.loaded_at >= self.max_age:
+                    return self._reload(None)
+            elif revision != self._snapshot.revision:
+                return self._reload(revision)
+            return self._snapshot
+
+    def invalidate(self):
+        with self._lock:
+            self._stale = True
+
+    def apply_matches(self, results, revisions=None):
+        # 比赛结果写入成功后调用，results: [(match_id, rows, h_total, a_total), ...]
+        # 生成新版本的快照 (不重新下载整表)。派生数据中带 replace_match() 方法的
+        # (例如物化统计表 Aggregates) 按差量更新后沿用，其余派生数据在新版本上按需重新计算。
+        # revisions: save_matches 返回的 (写入前, 写入后) 修订号，见 _written_revision
+        with self._lock:
+            old = self._snapshot
+            if old is None or self._stale:
+                self._stale = True
+                return
+
+            start = time.perf_counter()
+            schedule, logs = old.schedule, old.logs
+            # 其它会话可能正在 old.derive() 里写入 _derived，复制时加锁
+            with old._lock:
+                derived = dict(old._derived)
+            incremental = {k: v for k, v in derived.items() if hasattr(v, "replace_match")}
+            for match_id, rows, h_total, a_total in results:
+                schedule, logs, old_parts, new_parts = patch_match(
+                    schedule, logs, match_id, rows, h_total, a_total
+                )
+                for key, value in incremental.items():
+                    incremental[key] = value.replace_match(*old_parts, *new_parts)
+
+            self._version += 1
+            revision = _written_revision(old.revision, revisions)
+            snapshot = DataSnapshot(self._version, revision, schedule, logs,
+                                    self._restamp_config(old, revision), old.load_timings)
+            snapshot._derived.update(incremental)
+            self._snapshot = snapshot
+            self._checked_at = time.monotonic()
+            perf.record("data.apply_matches", time.perf_counter() - start, matches=len(results))
+
+    def confirm_write(self, revisions):
+        # 后台写入 (write_queue) 完成后调用：这些比赛提交时快照已经打过补丁，
+        # 写入前的修订号与快照一致时改记写入后的修订号，下一次检查不会因为自己的写入重新加载
+        with self._lock:
+            snapshot = self._snapshot
+            if snapshot is not None and not self._stale:
+                revision = _written_revision(snapshot.revision, revisions)
+                snapshot.config = self._restamp_config(snapshot, revision)
+                snapshot.revision = revision
+
+    def _restamp_config(self, snapshot, revision):
+        # 自己写入比赛结果不会改动 configs：快照的修订号跟着更新，重启后仍可跳过 configs
+        config = snapshot.config
+        if revision == snapshot.revision or config.revision != snapshot.revision:
+            return config
+        return config.restamped(revision, self.config_path)
+
+    def _current_revision(self):
+        if self._revision_fn is None:
+            return None
+        try:
+            return self._revision_fn()
+        except Exception:
+            # 修订号只是优化手段，失败时退化为按时间过期
+            return None
+
+    def _reload(self, revision):
+        # 先读本地配置快照：修订号一致时 configs 没有变化，只读取 schedule / matchlogs
+        config = ConfigSnapshot.read(self.config_path, revision)
+        with perf.span("data.reload", skip_config=config is not None):
+            if config is None:
+                (df_s, df_l, df_c), timings = self._loader()
+                config = ConfigSnapshot.build(df_c, revision)
+                config.save(self.config_path)
+            else:
+                (df_s, df_l, _), timings = self._loader(skip_config=True)
+        self._version += 1
+        self._snapshot = DataSnapshot(self._version, revision, df_s, df_l, config, timings)
+        self._stale = False
+        self._checked_at = time.monotonic()
+        return self._snapshot
+
+
+def _written_revision(current, revisions):
+    # 写入前的修订号与快照一致：期间没有其他人改动数据，打补丁后的快照就是写入后的版本。
+    # 否则 (或拿不到修订号) 沿用快照原来的修订号，下一次检查时重新加载，不会漏掉别人的修改
+    base, new = revisions or (None, None)
+    if base is not None and base == current:
+        return new
+    return current
+
+
+def patch_match(schedule, logs, match_id, rows, h_total, a_total):
+    # 返回新的 (schedule, logs)，以及这一场比赛修改前 / 修改后的 (schedule 行, matchlogs 行)
+    columns = logs.columns if len(logs.columns) else list(rows[0])
+    new_logs_part = pd.DataFrame(rows).reindex(columns=columns)
+
+    # matchlogs：与 sheet_writer.replace_match_logs 的写入位置一致，重新加载后顺序不变：
+    #   旧行原位覆盖，多出的行追加到末尾，少了的行 (该场靠后的旧行) 删除
+    mask = (logs["MatchID"] == match_id).to_numpy() if "MatchID" in logs.columns else np.zeros(len(logs), bool)
+    old_logs_part = logs[mask]
+    old_positions = np.flatnonzero(mask)
+    n_overwrite = min(len(old_positions), len(new_logs_part))
+
+    # 在 [旧表, 新行] 拼接后的表上按位置取行
+    order = np.arange(len(logs))
+    order[old_positions[:n_overwrite]] = len(logs) + np.arange(n_overwrite)
+    keep = np.ones(len(logs), bool)
+    keep[old_positions[n_overwrite:]] = False
+    order = np.concatenate([order[keep], len(logs) + np.arange(n_overwrite, len(new_logs_part))])
+    new_logs = pd.concat([logs, new_logs_part], ignore_index=True).iloc[order].reset_index(drop=True)
+
+    # schedule：复制一份再修改，不改动旧快照里的数据
+    new_schedule = schedule.copy()
+    row_mask = new_schedule["MatchID"] == match_id
+    old_schedule_part = schedule[row_mask]
+    new_schedule.loc[row_mask, ["Status", "HomeTotalPoints", "AwayTotalPoints"]] = ["Done", h_total, a_total]
+
+    return (new_schedule, new_logs,
+            (old_schedule_part, old_logs_part), (new_schedule[row_mask], new_logs_part))
+
+
+@st.cache_resource(show_spinner=False)
+def get_data_cache(_storage):
+    cache = DataCache(loader=_storage.load, revision_fn=_storage.revision,
+                      config_path=_storage.config_snapshot_path)
+    if _storage.write_behind:
+        # 写入在后台完成，修订号此时才变化 (SQLite 模式下缓存跟踪的是本地数据库，不需要)
+        _storage.on_flush = cache.confirm_write
+    return cache
@@ -0,0 +1,84 @@
+import numpy as np
+import pandas as pd
+
+from scoring import match_key
+
+# ==============================================================================
+# 历史战报索引 (纯 pandas / numpy，不依赖 Streamlit)
+# ==============================================================================
+# 数据加载后构建一次 (DataSnapshot.derive)，筛选时只做字典查找和有序数组求交集，
+# 不再每次都扫描 schedule 和整个 matchlogs。
+# "行号" 指 matchlogs 中的位置 (0 开始)，可直接用于 df_logs.iloc[rows]。
+
+_EMPTY = np.empty(0, dtype=np.int64)
+
+# 历史战报的排序方式
+SORT_ORDERS = ["最新在前", "最早在前", "MatchID 降序", "MatchID 升序"]
+
+
+def _rows_by(*columns):
+    # 多列合并后按值分组：{值: 出现过该值的行号 (升序、去重)}
+    keys = pd.concat(columns, ignore_index=True)
+    rows = np.tile(np.arange(len(columns[0]), dtype=np.int64), len(columns))
+    return {
+        key: np.unique(rows[idx])
+        for key, idx in keys.groupby(keys).indices.items()
+        if key != "无"  # 加赛未填写时的占位值
+    }
+
+
+class HistoryIndex:
+    def __init__(self, df_schedule, df_logs):
+        self.n_rows = len(df_logs)
+        # MatchID -> 行号
+        self.match_rows = {k: v.astype(np.int64) for k, v in df_logs.groupby("MatchID").indices.items()}
+        # 每一行所属比赛的录入先后 (按该场第一次出现的位置编号) 和 MatchID 自然排序的名次，用于排序
+        self.match_order = df_logs.groupby("MatchID", sort=False).ngroup().to_numpy()
+        match_ids = df_logs["MatchID"].astype(str)
+        ranks = {m: i for i, m in enumerate(sorted(match_ids.unique(), key=match_key))}
+        self.match_ranks = match_ids.map(ranks).to_numpy(dtype=np.int64)
+
+        # 队伍 -> MatchID (来自 schedule，matchlogs 里没有队伍名)
+        teams = pd.concat([df_schedule["HomeTeam"], df_schedule["AwayTeam"]], ignore_index=True)
+        match_ids = pd.concat([df_schedule["MatchID"], df_schedule["MatchID"]], ignore_index=True)
+        self.team_matches = {team: ids.unique() for team, ids in match_ids.groupby(teams)}
+
+        # 队伍 / 选手 / 角色 -> 行号
+        self.team_rows = {
+            team: np.unique(np.concatenate([self.match_rows.get(m, _EMPTY) for m in ids] or [_EMPTY]))
+            for team, ids in self.team_matches.items()
+        }
+        self.player_rows = _rows_by(df_logs["HomePlayer"], df_logs["AwayPlayer"])
+        self.character_rows = _rows_by(df_logs["HomeChar"], df_logs["AwayChar"])
+
+    @property
+    def players(self):
+        return sorted(self.player_rows)
+
+    @property
+    def characters(self):
+        return sorted(self.character_rows)
+
+    def filter_rows(self, team=None, player=None, character=None):
+        # 返回同时满足所有条件的行号；没有任何筛选条件时返回 None
+        selected = None
+        for rows, key in ((self.team_rows, team), (self.player_rows, player), (self.character_rows, character)):
+            if key is None:
+                continue
+            matched = rows.get(key, _EMPTY)
+            selected = matched if selected is None else np.intersect1d(selected, matched, assume_unique=True)
+        return selected
+
+    def versus_rows(self, a, b, characters=False):
+        # 选手 (或角色) a 与 b 交手的行号：每行只有主客两方，两者出现在同一行即互为对手
+        rows = self.character_rows if characters else self.player_rows
+        return np.intersect1d(rows.get(a, _EMPTY), rows.get(b, _EMPTY), assume_unique=True)
+
+    def sorted_rows(self, rows=None, order=SORT_ORDERS[0]):
+        # 按比赛排序；rows 本身是升序的，stable 排序保证同一场比赛内仍是先锋 / 中坚 / 大将 / 加赛
+        if rows is None:
+            rows = np.arange(self.n_rows, dtype=np.int64)
+        codes = self.match_order[rows] if order in ("最新在前", "最早在前") else self.match_ranks[rows]
+        if order in ("最新在前", "MatchID 降序"):
+            codes = -codes
+        return rows[np.argsort(codes, kind="stable")]
@@ -0,0 +1,111 @@
+import numpy as np
+import pandas as pd
+
+# ==============================================================================
+# 对战矩阵 (纯 numpy，不依赖 Streamlit)
+# ==============================================================================
+# 选手对选手、角色对角色的胜负计数，保存在 n × n 的整数数组里：
+#   wins[i, j] = 编码 i 战胜编码 j 的局数，i 与 j 之间的总局数 = wins[i, j] + wins[j, i]
+# 名字 -> 编码 (数组下标) 由 codes 给出。数据加载后构建一次 (DataSnapshot.derive)，
+# 录入时通过 replace_match() 减去该场旧记录、加上新记录，不需要重新 pivot 整个 matchlogs。
+# 同角色对战 (镜像局) 和加赛里 "无" 的占位不计入。
+
+
+def _pairs(df_logs, column):
+    # matchlogs -> (胜者数组, 负者数组)；column 为 "Player" 或 "Char"
+    if df_logs.empty or "Winner" not in df_logs.columns:
+        empty = np.empty(0, dtype=object)
+        return empty, empty
+    home = df_logs[f"Home{column}"].to_numpy(dtype=object)
+    away = df_logs[f"Away{column}"].to_numpy(dtype=object)
+    winner = df_logs["Winner"].to_numpy(dtype=object)
+    home_won = winner == "Home"
+
+    valid = (home_won | (winner == "Away")) & (home != away)
+    for side in (home, away):
+        valid &= pd.notna(side) & (side != "无") & (side != "")
+    winners = np.where(home_won, home, away)[valid]
+    losers = np.where(home_won, away, home)[valid]
+    return winners, losers
+
+
+class MatchupMatrix:
+    def __init__(self, names=(), wins=None):
+        self.names = list(names)
+        self.codes = {name: i for i, name in enumerate(self.names)}
+        n = len(self.names)
+        self.wins = wins if wins is not None else np.zeros((n, n), dtype=np.int32)
+
+    def updated(self, winners, losers, signs):
+        # 返回加上 (signs = 1) / 减去 (signs = -1) 这些对局后的新矩阵，不修改自身；新名字追加编码
+        new_names = [name for name in pd.unique(np.concatenate([winners, losers])) if name not in self.codes]
+        n_old, n = len(self.names), len(self.names) + len(new_names)
+        wins = np.zeros((n, n), dtype=np.int32)
+        wins[:n_old, :n_old] = self.wins
+        matrix = MatchupMatrix(self.names + new_names, wins)
+        np.add.at(
+            wins,
+            (np.array([matrix.codes[w] for w in winners], dtype=np.int64),
+             np.array([matrix.codes[l] for l in losers], dtype=np.int64)),
+            np.asarray(signs, dtype=np.int32),
+        )
+        return matrix
+
+    def games(self):
+        return self.wins + self.wins.T
+
+    def active_names(self):
+        # 至少打过一局的名字 (覆盖旧比赛后可能有局数归零的编码)
+        played = self.games().sum(axis=1) > 0
+        return sorted(name for name, p in zip(self.names, played) if p)
+
+    def record(self, name):
+        # 某个选手 / 角色对其他每个对手的战绩，按交手局数降序
+        columns = ["Opponent", "Battles", "Wins", "Losses", "Win Rate"]
+        i = self.codes.get(name)
+        if i is None:
+            return pd.DataFrame(columns=columns)
+        wins, losses = self.wins[i], self.wins[:, i]
+        battles = wins + losses
+        mask = battles > 0
+        record = pd.DataFrame({
+            "Opponent": np.array(self.names, dtype=object)[mask],
+            "Battles": battles[mask].astype(np.int64),
+            "Wins": wins[mask].astype(np.int64),
+            "Losses": losses[mask].astype(np.int64),
+        })
+        record["Win Rate"] = record["Wins"] / record["Battles"]
+        return record.sort_values(["Battles", "Win Rate"], ascending=False, ignore_index=True)
+
+    def frame(self):
+        # 完整矩阵：(行对列的胜率, 局数) 两个 DataFrame，只包含打过比赛的名字
+        names = self.active_names()
+        idx = [self.codes[name] for name in names]
+        wins = self.wins[np.ix_(idx, idx)]
+        games = wins + wins.T
+        with np.errstate(invalid="ignore", divide="ignore"):
+            rate = np.where(games > 0, wins / games, np.nan)
+        return pd.DataFrame(rate, index=names, columns=names), pd.DataFrame(games, index=names, columns=names)
+
+
+class Matchups:
+    def __init__(self, players, characters):
+        self.players = players
+        self.characters = characters
+
+    @classmethod
+    def build(cls, df_logs):
+        return cls(*(
+            MatchupMatrix(sorted(set(winners) | set(losers))).updated(winners, losers, np.ones(len(winners)))
+            for winners, losers in (_pairs(df_logs, "Player"), _pairs(df_logs, "Char"))
+        ))
+
+    def replace_match(self, old_schedule, old_logs, new_schedule, new_logs):
+        # 参数与 Aggregates.replace_match 相同，只用到 matchlogs 行；返回新的 Matchups
+        matrices = []
+        for matrix, column in ((self.players, "Player"), (self.characters, "Char")):
+            old_w, old_l = _pairs(old_logs, column)
+            new_w, new_l = _pairs(new_logs, column)
+            signs = np.concatenate([-np.ones(len(old_w)), np.ones(len(new_w))])
+            matrices.append(matrix.updated(np.concatenate([old_w, new_w]), np.concatenate([old_l, new_l]), signs))
+        return Matchups(*matrices)
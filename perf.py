@@ -0,0 +1,94 @@
+import json
+import logging
+import threading
+import time
+from collections import Counter, defaultdict, deque
+from contextlib import contextmanager
+
+# ==============================================================================
+# 热点路径计时 (进程内共享，不依赖 Streamlit)
+# ==============================================================================
+# 用法：
+#   with perf.span("tab2.standings"):
+#       ...
+#   perf.count("sheets.read")
+#
+# 每个 span 的耗时保存在最近 MAX_SAMPLES 条的环形队列里，用于计算 p50 / p95；
+# 同时以 JSON 格式写入 "sfl.perf" logger (配置 logging 后即可输出结构化日志)，
+# 也可以在管理员的性能面板里导出为 JSON Lines。
+
+MAX_SAMPLES = 500
+MAX_EVENTS = 2000
+
+logger = logging.getLogger("sfl.perf")
+
+_lock = threading.Lock()
+_samples = defaultdict(lambda: deque(maxlen=MAX_SAMPLES))
+_events = deque(maxlen=MAX_EVENTS)
+_counters = Counter()
+
+
+def record(name, seconds, **attrs):
+    event = {"ts": round(time.time(), 3), "type": "span", "name": name, "ms": round(seconds * 1000, 2), **attrs}
+    with _lock:
+        _samples[name].append(seconds)
+        _events.append(event)
+    logger.info(json.dumps(event, ensure_ascii=False))
+
+
+@contextmanager
+def span(name, **attrs):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(name, time.perf_counter() - start, **attrs)
+
+
+def count(name, n=1):
+    # 计数器，例如 Google API 的 HTTP 请求数
+    event = {"ts": round(time.time(), 3), "type": "count", "name": name, "n": n}
+    with _lock:
+        _counters[name] += n
+        _events.append(event)
+    logger.info(json.dumps(event, ensure_ascii=False))
+
+
+def _percentile(sorted_values, q):
+    index = min(len(sorted_values) - 1, int(round(q * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def summary():
+    # -> [{"name", "count", "p50_ms", "p95_ms", "last_ms"}, ...]，按 p95 降序
+    with _lock:
+        samples = {name: list(values) for name, values in _samples.items()}
+    rows = []
+    for name, values in samples.items():
+        ordered = sorted(values)
+        rows.append({
+            "name": name,
+            "count": len(values),
+            "p50_ms": round(_percentile(ordered, 0.50) * 1000, 1),
+            "p95_ms": round(_percentile(ordered, 0.95) * 1000, 1),
+            "last_ms": round(values[-1] * 1000, 1),
+        })
+    return sorted(rows, key=lambda row: row["p95_ms"], reverse=True)
+
+
+def counters():
+    with _lock:
+        return dict(_counters)
+
+
+def export_jsonl():
+    with _lock:
+        events = list(_events)
+    return "\n".join(json.dumps(event, ensure_ascii=False) for event in events)
+
+
+def reset():
+    with _lock:
+        _samples.clear()
+        _events.clear()
+        _counters.clear()
@@ -0,0 +1,142 @@
+import bisect
+
+import pandas as pd
+
+from scoring import POSITION_POINTS, match_key
+
+# ==============================================================================
+# 等级分 (Elo，纯 Python，不依赖 Streamlit)
+# ==============================================================================
+# 胜率对出场少的选手并不可靠 (1 胜 0 负就是 100%)。这里按比赛顺序逐局计算 Elo：
+#   预期胜率 E = 1 / (1 + 10 ^ ((对手分 - 自己分) / 400))
+#   新分 = 旧分 + K × 位置权重 × (实际结果 - E)      位置权重 = 该位置得分 / 10，大将战为 2
+# 选手和角色各有一套等级分 (角色之间按双方所用角色对战计算)。
+#
+# 结果保存在共享缓存里 (DataSnapshot.derive)，录入时通过 replace_match() 更新：
+#   - 新比赛 (MatchID 排在已计入的比赛之后)：只计算这一场的几局；
+#   - 覆盖旧比赛 / 补录更早的比赛：Elo 与对局顺序有关，该场之后的比赛都要重新计算，
+#     但之前的部分直接从最近的检查点恢复 (每 CHECKPOINT_EVERY 场保存一次)。
+# 比赛顺序按 MatchID 自然排序 (scoring.match_key)，与历史战报页的 "MatchID 升序" 一致。
+
+BASE_RATING = 1500.0
+K_FACTOR = 32
+CHECKPOINT_EVERY = 200
+
+
+class Ratings:
+    def __init__(self, matches, battles, state, checkpoints):
+        self.matches = matches          # 已计入的 MatchID (字符串)，按 match_key 升序
+        self.battles = battles          # {MatchID: [(主队选手, 客队选手, 主队角色, 客队角色, 主队获胜, 权重), ...]}
+        self.state = state              # (选手等级分, 角色等级分, 选手局数, 角色局数)，均为 dict
+        self.checkpoints = checkpoints  # [(已计入场数, state), ...]，场数升序，第一个总是 (0, 空)
+
+    @classmethod
+    def build(cls, df_logs):
+        battles = _battles_by_match(df_logs)
+        return cls._replay(sorted(battles, key=match_key), battles, [(0, _empty_state())], 0)
+
+    @classmethod
+    def _replay(cls, matches, battles, checkpoints, start):
+        # 从 matches[start] 之前最近的检查点开始重新计算；检查点里的 state 不会被修改
+        checkpoints = [cp for cp in checkpoints if cp[0] <= start]
+        done, state = checkpoints[-1]
+        state = _copy_state(state)
+        for i in range(done, len(matches)):
+            _apply(state, battles[matches[i]])
+            if (i + 1) % CHECKPOINT_EVERY == 0:
+                checkpoints.append((i + 1, _copy_state(state)))
+        return cls(matches, battles, state, checkpoints)
+
+    def replace_match(self, old_schedule, old_logs, new_schedule, new_logs):
+        # 参数与 Aggregates.replace_match 相同，等级分只用到 matchlogs 行；返回新的 Ratings，不修改自身
+        new = _battles_by_match(new_logs)
+        keys = set(_battles_by_match(old_logs)) | set(new)
+        if not keys:
+            return self
+
+        battles = dict(self.battles)
+        for key in keys:
+            if key in new:
+                battles[key] = new[key]
+            else:
+                battles.pop(key, None)
+
+        first = min(keys, key=match_key)
+        if not self.matches or match_key(first) > match_key(self.matches[-1]):
+            # 新比赛排在最后：在当前等级分上接着算
+            state = _copy_state(self.state)
+            matches = self.matches + sorted(keys, key=match_key)
+            checkpoints = list(self.checkpoints)
+            for i in range(len(self.matches), len(matches)):
+                _apply(state, battles[matches[i]])
+                if (i + 1) % CHECKPOINT_EVERY == 0:
+                    checkpoints.append((i + 1, _copy_state(state)))
+            return Ratings(matches, battles, state, checkpoints)
+
+        # 改动了已计入的比赛：从改动的第一场开始重放
+        matches = sorted(battles, key=match_key)
+        start = bisect.bisect_left(matches, match_key(first), key=match_key)
+        return Ratings._replay(matches, battles, self.checkpoints, start)
+
+    def player_table(self):
+        players, _, games, _ = self.state
+        return _table(players, games, "Player")
+
+    def character_table(self):
+        _, characters, _, games = self.state
+        return _table(characters, games, "Character")
+
+
+def _empty_state():
+    return ({}, {}, {}, {})
+
+
+def _copy_state(state):
+    return tuple(dict(d) for d in state)
+
+
+def _valid(name):
+    # 过滤加赛里 "无" 的占位和空值
+    return isinstance(name, str) and name not in ("", "无")
+
+
+def _battles_by_match(df_logs):
+    # matchlogs -> {MatchID: [(主队选手, 客队选手, 主队角色, 客队角色, 主队获胜, 权重), ...]}，保持表内顺序
+    battles = {}
+    if df_logs.empty or "Winner" not in df_logs.columns:
+        return battles
+    columns = ["MatchID", "HomePlayer", "AwayPlayer", "HomeChar", "AwayChar", "Winner", "Position"]
+    for match_id, hp, ap, hc, ac, winner, position in zip(*(df_logs[c].tolist() for c in columns)):
+        if winner not in ("Home", "Away"):
+            continue
+        weight = POSITION_POINTS.get(position, 10) / 10
+        battles.setdefault(str(match_id), []).append((hp, ap, hc, ac, winner == "Home", weight))
+    return battles
+
+
+def _update(ratings, games, a, b, a_won, weight):
+    ra, rb = ratings.get(a, BASE_RATING), ratings.get(b, BASE_RATING)
+    expected = 1 / (1 + 10 ** ((rb - ra) / 400))
+    delta = K_FACTOR * weight * ((1.0 if a_won else 0.0) - expected)
+    ratings[a], ratings[b] = ra + delta, rb - delta
+    games[a] = games.get(a, 0) + 1
+    games[b] = games.get(b, 0) + 1
+
+
+def _apply(state, battles):
+    players, characters, player_games, character_games = state
+    for hp, ap, hc, ac, home_won, weight in battles:
+        if _valid(hp) and _valid(ap):
+            _update(players, player_games, hp, ap, home_won, weight)
+        # 同角色对战 (镜像局) 不影响角色等级分
+        if _valid(hc) and _valid(ac) and hc != ac:
+            _update(characters, character_games, hc, ac, home_won, weight)
+
+
+def _table(ratings, games, key):
+    table = pd.DataFrame({
+        key: list(ratings),
+        "Rating": [round(r) for r in ratings.values()],
+        "Battles": [games[name] for name in ratings],
+    }, columns=[key, "Rating", "Battles"])
+    return table.sort_values("Rating", ascending=False, ignore_index=True)
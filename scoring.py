@@ -0,0 +1,79 @@
+import re
+
+# ==============================================================================
+# 计分规则 (纯 Python，不依赖 Streamlit / pandas)
+# ==============================================================================
+# 一场比赛 = 先锋战 (10) + 中坚战 (10) + 大将战 (20)；
+# 打成 20-20 时进行加赛 (10)，加赛必须分出胜负。
+# 单场录入 (Tab 1)、批量导入 (bulk_import.py) 和统计 (stats.py) 共用这里的规则。
+
+# 各位置获胜得分
+POSITION_POINTS = {"Vanguard": 10, "Center": 10, "General": 20, "Extra": 10}
+
+REQUIRED_POSITIONS = ("Vanguard", "Center", "General")
+
+# 各位置单边得分上限 (BO3 抢2，大将抢3)，与录入表单的输入范围一致
+MAX_SCORE = {"Vanguard": 2, "Center": 2, "General": 3, "Extra": 2}
+
+
+def match_key(match_id):
+    # MatchID 的自然排序键：'W10-M2' -> ('W', 10, '-M', 2, '')，数字段按数值比较，
+    # W10-M1 排在 W9-M1 之后 (按字符串排序会排在 W2-M1 之前)。等级分和历史战报共用
+    parts = re.split(r"(\d+)", str(match_id))
+    return tuple(int(p) if i % 2 else p for i, p in enumerate(parts))
+
+
+def parse_score(position, score):
+    # "2-1" -> (2, 1)；格式错误、超出范围或平局时抛出 ValueError
+    try:
+        h, a = (int(x) for x in str(score).split("-"))
+    except ValueError:
+        raise ValueError(f"{position} 比分格式错误: '{score}' (应为 2-1 这样的格式)") from None
+    if not (0 <= h <= MAX_SCORE[position] and 0 <= a <= MAX_SCORE[position]):
+        raise ValueError(f"{position} 比分超出范围: {score} (每边最多 {MAX_SCORE[position]})")
+    if h == a:
+        raise ValueError(f"{position} 比分不能是平局: {score}")
+    return h, a
+
+
+def score_match(match_id, battles, drop_unused_extra=False):
+    # battles: 该场的对局记录 (dict 列表，含 Position / 双方选手和角色 / Score)。
+    # 返回 (写入 matchlogs 的行, 主队总分, 客队总分)，不合法时抛出 ValueError。
+    # drop_unused_extra=True 时，非 20-20 平局下的加赛记录直接忽略 (录入表单总会带上加赛栏)。
+    by_position = {}
+    for battle in battles:
+        position = battle["Position"]
+        if position not in POSITION_POINTS:
+            raise ValueError(f"未知的位置: {position}")
+        if position in by_position:
+            raise ValueError(f"{position} 重复出现")
+        by_position[position] = battle
+
+    missing = [p for p in REQUIRED_POSITIONS if p not in by_position]
+    if missing:
+        raise ValueError(f"缺少对局: {', '.join(missing)}")
+
+    rows = []
+    totals = {"Home": 0, "Away": 0}
+    for position in REQUIRED_POSITIONS + ("Extra",):
+        battle = by_position.get(position)
+        if battle is None:
+            continue
+        if position == "Extra" and totals["Home"] != totals["Away"]:
+            if drop_unused_extra:
+                continue
+            raise ValueError(f"比分 {totals['Home']}-{totals['Away']} 不是平局，不应有加赛")
+
+        h, a = parse_score(position, battle["Score"])
+        winner = "Home" if h > a else "Away"
+        totals[winner] += POSITION_POINTS[position]
+        rows.append({
+            "MatchID": match_id, "Position": position,
+            "HomePlayer": battle["HomePlayer"], "HomeChar": battle["HomeChar"],
+            "AwayPlayer": battle["AwayPlayer"], "AwayChar": battle["AwayChar"],
+            "Winner": winner, "Score": f"{h}-{a}",
+        })
+
+    if totals["Home"] == totals["Away"]:
+        raise ValueError(f"比分 {totals['Home']}-{totals['Away']}，缺少加赛结果")
+    return rows, totals["Home"], totals["Away"]
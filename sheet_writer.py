@@ -0,0 +1,115 @@
+from gspread.utils import rowcol_to_a1
+
+import perf
+
+# ==============================================================================
+# 增量写入 Google Sheet
+# ==============================================================================
+# conn.update 会清空整张表再整表写回，写入耗时随赛季变长而增加，
+# 两个管理员同时提交时后写入的一方还会覆盖前者的结果。
+# 这里只改动受影响的行 / 单元格：
+#   - MatchLog：该场旧记录原位覆盖，多出的行追加到末尾，少了的行删除；
+#   - Schedule：只更新该场的 Status / HomeTotalPoints / AwayTotalPoints 三个单元格。
+# 写入前先确认所有比赛都在 Schedule 表中 (locate_schedule)，有一场不存在就整批不写。
+# 一次可以提交多场 (批量导入)，所有改动合并成尽量少的 API 请求。
+# 行号每次都从表格实时读取 (只读表头和 MatchID 一列)，不依赖本地可能过期的数据。
+
+
+def _select_worksheet(conn, name, spreadsheet=None):
+    # spreadsheet：已打开的表格 (GSheetsStorage 复用同一个)，为 None 时按连接配置重新打开
+    client = conn.client
+    # 只有 Service Account 模式支持写入；公开链接模式没有 _select_worksheet
+    if not hasattr(client, "_select_worksheet"):
+        raise RuntimeError("当前为公开链接模式，无法写入。请在 secrets 中配置 Service Account。")
+    perf.count("sheets_op.select_worksheet")
+    return client._select_worksheet(spreadsheet=spreadsheet, worksheet=name)
+
+
+def _cell(value):
+    # DataFrame / numpy 的值转换成 Sheets API 可接受的 JSON 类型
+    if value is None or value != value:  # None / NaN
+        return ""
+    if hasattr(value, "item"):
+        return value.item()
+    return value
+
+
+def _locate(ws, key_column):
+    # 返回 (表头, {key: 行号列表})，行号从 1 开始，第 1 行是表头
+    header = ws.row_values(1)
+    keys = ws.col_values(header.index(key_column) + 1)
+    perf.count("sheets_op.read_cells", 2)
+    rows = {}
+    for i, value in enumerate(keys[1:], start=2):
+        rows.setdefault(value, []).append(i)
+    return header, rows
+
+
+def _row_range(row, n_cols):
+    return f"{rowcol_to_a1(row, 1)}:{rowcol_to_a1(row, n_cols)}"
+
+
+def _delete_rows(ws, rows):
+    # 连续的行合并成一次删除；从下往上删，避免行号错位
+    rows = sorted(rows, reverse=True)
+    while rows:
+        end = start = rows.pop(0)
+        while rows and rows[0] == start - 1:
+            start = rows.pop(0)
+        ws.delete_rows(start, end)
+        perf.count("sheets_op.delete_rows")
+
+
+def replace_match_logs(conn, matches, worksheet="MatchLog", spreadsheet=None):
+    # matches: {MatchID: [该场的全部对局记录]}，一次提交任意多场
+    ws = _select_worksheet(conn, worksheet, spreadsheet)
+    header, existing = _locate(ws, "MatchID")
+
+    updates, appends, deletes = [], [], []
+    for match_id, rows in matches.items():
+        old_rows = existing.get(str(match_id), [])
+        values = [[_cell(row.get(col)) for col in header] for row in rows]
+
+        # 1. 旧行原位覆盖
+        n_overwrite = min(len(old_rows), len(values))
+        updates += [{"range": _row_range(r, len(header)), "values": [v]}
+                    for r, v in zip(old_rows[:n_overwrite], values[:n_overwrite])]
+        # 2. 新记录比旧记录多：追加到表格末尾 (首次录入 / 新增了加赛)
+        appends += values[n_overwrite:]
+        # 3. 旧记录比新记录多 (例如重新提交后不再有加赛)：删除多余的行
+        deletes += old_rows[n_overwrite:]
+
+    # 不论提交多少场，最多 1 次 batch 覆盖 + 1 次追加 + 若干次删除
+    if updates:
+        ws.batch_update(updates, value_input_option="RAW")
+        perf.count("sheets_op.batch_update")
+    if appends:
+        ws.append_rows(appends, value_input_option="RAW")
+        perf.count("sheets_op.append_rows")
+    if deletes:
+        _delete_rows(ws, deletes)
+
+
+def locate_schedule(conn, match_ids, worksheet="Schedule", spreadsheet=None):
+    # 写入 MatchLog 之前调用：确认这些比赛都在 Schedule 表中，
+    # 否则对局记录写完后才在更新 Schedule 时失败，留下没有对应比赛的记录
+    ws = _select_worksheet(conn, worksheet, spreadsheet)
+    header, existing = _locate(ws, "MatchID")
+
+    missing = [match_id for match_id in match_ids if str(match_id) not in existing]
+    if missing:
+        raise KeyError(f"Schedule 表中找不到比赛 {', '.join(map(str, missing))}")
+    return ws, header, existing
+
+
+def update_schedule_results(schedule, results, status="Done"):
+    # schedule: locate_schedule 的返回值；results: {MatchID: (HomeTotalPoints, AwayTotalPoints)}
+    ws, header, existing = schedule
+    updates = []
+    for match_id, (h_total, a_total) in results.items():
+        row = existing[str(match_id)][0]
+        cells = {"Status": status, "HomeTotalPoints": h_total, "AwayTotalPoints": a_total}
+        updates += [{"range": rowcol_to_a1(row, header.index(col) + 1), "values": [[_cell(value)]]}
+                    for col, value in cells.items()]
+    ws.batch_update(updates, value_input_option="RAW")
+    perf.count("sheets_op.batch_update")
@@ -0,0 +1,60 @@
+import pandas as pd
+
+# ==============================================================================
+# 积分榜 (纯 pandas，不依赖 Streamlit)
+# ==============================================================================
+# 已完成 (Done) 的比赛拆成主客两行 (每支队伍一行)，然后一次 groupby 算出
+# 积分、场次、胜负、净胜分；加赛胜场从 battles 长表里统计，作为排名的最后一个依据。
+# team_counts() 只含可加减的计数 (由 aggregates.py 增量维护)，
+# compute_standings() 在其基础上算出胜负、净胜分并排序。
+
+STANDINGS_COLUMNS = ["Team", "Points", "Matches", "Wins", "Losses", "PointDiff", "ExtraWins"]
+
+# 排名依据：积分 > 胜场 > 净胜分 > 加赛胜场
+TIEBREAK_ORDER = ["Points", "Wins", "PointDiff", "ExtraWins"]
+
+
+def team_counts(df_schedule, battles=None):
+    # 每支队伍的累计数据 (可相加减的计数表，见 aggregates.py)
+    done = df_schedule[df_schedule["Status"] == "Done"]
+    home_pts = done["HomeTotalPoints"].fillna(0)
+    away_pts = done["AwayTotalPoints"].fillna(0)
+
+    per_team = pd.DataFrame({
+        "Team": pd.concat([done["HomeTeam"], done["AwayTeam"]], ignore_index=True),
+        "PointsFor": pd.concat([home_pts, away_pts], ignore_index=True),
+        "PointsAgainst": pd.concat([away_pts, home_pts], ignore_index=True),
+    })
+    per_team["Win"] = per_team["PointsFor"] > per_team["PointsAgainst"]
+
+    table = per_team.groupby("Team").agg(
+        Points=("PointsFor", "sum"),
+        Matches=("Team", "size"),
+        Wins=("Win", "sum"),
+        PointsAgainst=("PointsAgainst", "sum"),
+    )
+    table["ExtraWins"] = _extra_wins(done, battles).reindex(table.index, fill_value=0)
+    table.index = pd.Index(table.index.astype(object), name="Team")
+    return table.astype("int64")
+
+
+def compute_standings(counts, teams):
+    table = counts.copy()
+    table["Losses"] = table["Matches"] - table["Wins"]
+    table["PointDiff"] = table["Points"] - table["PointsAgainst"]
+
+    # 以 configs 登记的队伍为准，还没打过比赛的队伍记 0
+    table = table.reindex(pd.Index(teams, name="Team"), fill_value=0)
+    table = table.sort_values(TIEBREAK_ORDER, ascending=False).reset_index()
+    return table[STANDINGS_COLUMNS].astype({col: "int64" for col in STANDINGS_COLUMNS[1:]})
+
+
+def _extra_wins(done, battles):
+    if battles is None or battles.empty:
+        return pd.Series(dtype="int64")
+
+    extra = battles[(battles["Position"] == "Extra") & battles["IsWin"]]
+    teams = done.set_index("MatchID")[["HomeTeam", "AwayTeam"]]
+    extra = extra.join(teams, on="MatchID", how="inner")
+    winner = extra["HomeTeam"].where(extra["Side"] == "Home", extra["AwayTeam"])
+    return winner.value_counts()
@@ -0,0 +1,84 @@
+import pandas as pd
+
+from scoring import POSITION_POINTS
+
+# ==============================================================================
+# 对局统计 (纯 pandas 计算)
+# ==============================================================================
+# "长表" battles 只在 Aggregates.build 里构建 (数据加载时对整表，录入时对单场)，
+# 用于统计各角色 / 选手 / 队伍的计数表；页面不直接读取它。
+# matchlogs 的每一行拆成 Home / Away 两行，每行对应一名选手使用一个角色的一局。
+#
+#   LogRow  MatchID  Side  Player  Character  Position  IsWin  Points
+
+
+def build_battles(df_logs):
+    def side(prefix, winner):
+        return pd.DataFrame({
+            "LogRow": range(len(df_logs)),
+            "MatchID": df_logs["MatchID"].to_numpy(),
+            "Side": winner,
+            "Player": df_logs[f"{prefix}Player"].to_numpy(),
+            "Character": df_logs[f"{prefix}Char"].to_numpy(),
+            "Position": df_logs["Position"].to_numpy(),
+            "IsWin": (df_logs["Winner"] == winner).to_numpy(),
+        })
+
+    battles = pd.concat([side("Home", "Home"), side("Away", "Away")], ignore_index=True)
+    # 过滤掉加赛里 "无" 的占位记录
+    battles = battles[battles["Character"] != "无"].reset_index(drop=True)
+
+    # 位置 -> 得分：一次 map + where，代替逐行 apply
+    points = battles["Position"].map(POSITION_POINTS).fillna(0).astype("int64")
+    battles["Points"] = points.where(battles["IsWin"], 0)
+
+    for col in ("Side", "Player", "Character", "Position"):
+        battles[col] = battles[col].astype("category")
+    return battles
+
+
+def _counts(battles, key, **aggs):
+    counts = battles.groupby(key, observed=True).agg(**aggs)
+    # 普通 object 索引，方便与其它计数表相加减 (见 aggregates.py)
+    counts.index = pd.Index(counts.index.astype(object), name=key)
+    return counts.astype("int64")
+
+
+def character_counts(battles):
+    return _counts(
+        battles, "Character",
+        Total_Battles=("Player", "size"),
+        Wins=("IsWin", "sum"),
+        Total_Points=("Points", "sum"),
+    )
+
+
+def player_counts(battles):
+    return _counts(
+        battles, "Player",
+        Total_Battles=("Character", "size"),
+        Wins=("IsWin", "sum"),
+    )
+
+
+def position_counts(df_logs):
+    # 各位置的主场 / 客场胜局数
+    wins = pd.crosstab(df_logs["Position"], df_logs["Winner"])
+    wins = wins.reindex(columns=["Home", "Away"], fill_value=0)
+    wins.index = pd.Index(wins.index.astype(object), name="Position")
+    wins.columns.name = None
+    return wins.astype("int64")
+
+
+def with_win_rate(counts):
+    # 角色 / 选手计数表 -> 展示用的表格 (增加胜率列)
+    stats = counts.reset_index()
+    stats["Win Rate"] = stats["Wins"] / stats["Total_Battles"]
+    return stats
+
+
+def position_stats(counts):
+    wins = counts.copy()
+    wins["Total"] = wins["Home"] + wins["Away"]
+    wins["Home Win %"] = (wins["Home"] / wins["Total"].where(wins["Total"] > 0)).fillna(0)
+    return wins
@@ -0,0 +1,308 @@
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing
+
+import pandas as pd
+import streamlit as st
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+
+import perf
+
+# ==============================================================================
+# 存储后端
+# ==============================================================================
+# app 只通过 Storage 接口读写 schedule / matchlogs / configs：
+#   - GSheetsStorage：直接读写 Google Sheet (默认)；
+#   - SQLiteStorage：读写本地 SQLite 文件，可选把每次录入同步写回 Google Sheet。
+# 在 .streamlit/secrets.toml 中选择：
+#
+#   [storage]
+#   backend = "sqlite"        # 或 "gsheets"
+#   path = "sfl.db"
+#   sync_gsheets = true       # 录入时同步写回 Google Sheet，空库时从 Sheet 初始化
+#   write_behind = true       # Google Sheet 的写入改为后台队列 (见 write_queue.py)
+
+SHEET_NAMES = ("schedule", "matchlogs", "configs")
+
+SCHEDULE_COLUMNS = ["MatchID", "HomeTeam", "AwayTeam", "Status", "HomeTotalPoints", "AwayTotalPoints"]
+LOG_COLUMNS = ["MatchID", "Position", "HomePlayer", "HomeChar", "AwayPlayer", "AwayChar", "Winner", "Score"]
+CONFIG_COLUMNS = ["Team", "Player", "Character"]
+# 数值列：SQLite 建表时指定类型，读取时转换成数字
+POINT_COLUMNS = ["HomeTotalPoints", "AwayTotalPoints"]
+
+
+class SyncError(Exception):
+    """本地已写入成功，但同步到 Google Sheet 失败。"""
+
+    def __init__(self, message, revisions=None):
+        super().__init__(message)
+        # 本地写入前后的修订号 (见 Storage.save_matches)
+        self.revisions = revisions
+
+
+class Storage:
+    label = ""
+    # 写入是否经过后台队列 (见 write_queue.py)
+    write_behind = False
+    # 配置快照文件 (见 config_snapshot.py)；None 表示读取 configs 本来就很快，不需要快照
+    config_snapshot_path = None
+
+    def load(self, skip_config=False):
+        # -> ((df_schedule, df_logs, df_config), load_timings)
+        # skip_config：configs 没有变化 (配置快照仍有效) 时不读取，df_config 返回 None
+        raise NotImplementedError
+
+    def revision(self):
+        # 廉价的修订标记，用于判断缓存是否过期；返回 None 表示无法获取
+        return None
+
+    def save_match(self, match_id, rows, h_total, a_total):
+        # 用 rows 替换该场的全部对局记录，并把 Schedule 中该场标记为 Done
+        return self.save_matches([(match_id, rows, h_total, a_total)])
+
+    def save_matches(self, results):
+        # results: [(match_id, rows, h_total, a_total), ...]，一次批量写入
+        # 返回 (写入前的修订号, 写入后的修订号)，拿不到时为 None。共享缓存据此判断
+        # 修订号的变化是否只来自这次写入 (见 DataCache.apply_matches)
+        raise NotImplementedError
+
+    def _safe_revision(self):
+        try:
+            return self.revision()
+        except Exception:
+            return None
+
+
+# ==============================================================================
+# Google Sheets
+# ==============================================================================
+class GSheetsStorage(Storage):
+    label = "Google Sheet"
+    config_snapshot_path = "sfl_config.json"
+
+    def __init__(self, conn):
+        self.conn = conn
+        self._spreadsheet = None
+        _count_http_requests(conn)
+
+    def load(self, skip_config=False):
+        # 三张表并发读取，冷启动只需等待最慢的一张，而不是三次往返之和
+        ctx = get_script_run_ctx()
+        timings = {}
+
+        def read_one(name):
+            # 子线程挂上当前会话的上下文，conn.read 内部的 st.cache_data 才能正常工作
+            add_script_run_ctx(threading.current_thread(), ctx)
+            start = time.perf_counter()
+            # ttl=0：绕过 st-gsheets-connection 自带的缓存，由 DataCache 统一管理
+            df = self.conn.read(worksheet=name, ttl=0)
+            timings[name] = time.perf_counter() - start
+            perf.count("sheets_op.read")
+            return df
+
+        names = SHEET_NAMES[:2] if skip_config else SHEET_NAMES
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=len(names)) as pool:
+            frames = tuple(pool.map(read_one, names))
+        timings["total"] = time.perf_counter() - start
+        return frames + (None,) * (len(SHEET_NAMES) - len(names)), timings
+
+    def revision(self):
+        # 只有 Service Account 模式能访问 Drive API；公开链接模式返回 None
+        spreadsheet = self._open_spreadsheet()
+        if spreadsheet is None:
+            return None
+        # 一次 Drive API 调用，只返回 modifiedTime，不下载表格内容
+        perf.count("sheets_op.modified_time")
+        return spreadsheet.get_lastUpdateTime()
+
+    def _open_spreadsheet(self):
+        # 打开一次后复用 (open_by_url 本身要请求一次表格元数据)；公开链接模式返回 None
+        client = self.conn.client
+        if not hasattr(client, "_open_spreadsheet"):
+            return None
+        if self._spreadsheet is None:
+            self._spreadsheet = client._open_spreadsheet()
+            perf.count("sheets_op.open_spreadsheet")
+        return self._spreadsheet
+
+    def save_matches(self, results):
+        from sheet_writer import locate_schedule, replace_match_logs, update_schedule_results
+
+        base = self._safe_revision()
+        spreadsheet = self._open_spreadsheet()
+        schedule = locate_schedule(self.conn, [match_id for match_id, _, _, _ in results], spreadsheet=spreadsheet)
+        replace_match_logs(self.conn, {match_id: rows for match_id, rows, _, _ in results}, spreadsheet=spreadsheet)
+        update_schedule_results(schedule, {match_id: (h, a) for match_id, _, h, a in results})
+        return base, self._safe_revision()
+
+
+def _count_http_requests(conn):
+    # Sheets / Drive 配额按 HTTP 请求计算，而一次 conn.read 实际包含打开表格、读取工作表元数据、
+    # 读取数值等多次请求。gspread 的所有请求都经过 Client.request，在这里按接口计数
+    # (sheets_http.*)；公开链接模式直接下载 CSV，不经过 gspread，不计入
+    client = getattr(conn.client, "_client", None)
+    if client is None or getattr(client, "_sfl_counted", False):
+        return
+    request = client.request
+
+    def counted_request(method, endpoint, *args, **kwargs):
+        api = "drive" if "/drive/" in endpoint else "sheets"
+        perf.count(f"sheets_http.{api}.{method}")
+        return request(method, endpoint, *args, **kwargs)
+
+    client.request = counted_request
+    # st.connection 的连接对象在进程内共用，get_storage 缓存被清空后重新创建时不要重复包装
+    client._sfl_counted = True
+
+
+# ==============================================================================
+# SQLite (本地磁盘)
+# ==============================================================================
+class SQLiteStorage(Storage):
+    label = "本地数据库"
+
+    def __init__(self, path, sync_target=None):
+        self.path = path
+        self.sync_target = sync_target
+        self._init_db()
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=30)
+
+    def _init_db(self):
+        with closing(self._connect()) as db, db:
+            db.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER)")
+            db.execute("INSERT OR IGNORE INTO meta VALUES ('revision', 0)")
+            existing = {r[0] for r in db.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+
+        if "schedule" in existing:
+            return
+        if self.sync_target is not None:
+            # 空库：从 Google Sheet 拉取一次完整数据作为初始内容
+            self.import_from(self.sync_target)
+        else:
+            empty = (pd.DataFrame(columns=SCHEDULE_COLUMNS),
+                     pd.DataFrame(columns=LOG_COLUMNS),
+                     pd.DataFrame(columns=CONFIG_COLUMNS))
+            self.import_frames(*empty)
+
+    def import_frames(self, df_schedule, df_logs, df_config):
+        # 整表替换 (初始化 / 从 Google Sheet 重新同步)
+        with closing(self._connect()) as db, db:
+            for name, df in zip(SHEET_NAMES, (df_schedule, df_logs, df_config)):
+                # 空表建出来的列都是 TEXT，积分列需要显式指定为数值类型
+                dtype = {col: "INTEGER" for col in POINT_COLUMNS} if name == "schedule" else None
+                df.to_sql(name, db, if_exists="replace", index=False, dtype=dtype)
+            db.execute("CREATE INDEX IF NOT EXISTS idx_logs_match ON matchlogs (MatchID)")
+            db.execute("UPDATE meta SET value = value + 1 WHERE key = 'revision'")
+
+    def import_from(self, storage):
+        frames, _ = storage.load()
+        self.import_frames(*frames)
+
+    def load(self, skip_config=False):
+        timings = {}
+        frames = []
+        start = time.perf_counter()
+        with closing(self._connect()) as db:
+            for name in SHEET_NAMES[:2] if skip_config else SHEET_NAMES:
+                t0 = time.perf_counter()
+                # ORDER BY rowid：保持记录的写入顺序
+                frames.append(pd.read_sql(f'SELECT * FROM "{name}" ORDER BY rowid', db))
+                timings[name] = time.perf_counter() - t0
+        # 兼容旧版本建出的 TEXT 积分列
+        schedule = frames[0]
+        for col in POINT_COLUMNS:
+            if col in schedule.columns:
+                schedule[col] = pd.to_numeric(schedule[col], errors="coerce")
+        timings["total"] = time.perf_counter() - start
+        return tuple(frames) + (None,) * (len(SHEET_NAMES) - len(frames)), timings
+
+    def revision(self):
+        with closing(self._connect()) as db:
+            return db.execute("SELECT value FROM meta WHERE key = 'revision'").fetchone()[0]
+
+    def save_matches(self, results):
+        # 所有场次在同一个事务里写入
+        with closing(self._connect()) as db, db:
+            columns = [r[1] for r in db.execute("PRAGMA table_info(matchlogs)")]
+            insert = f"INSERT INTO matchlogs ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})"
+            update = f"UPDATE matchlogs SET {', '.join(f'{col} = ?' for col in columns)} WHERE rowid = ?"
+            # 与 Google Sheet 相同：有一场不在 schedule 表中就整批不写 (抛出异常，事务回滚)
+            known = {r[0] for r in db.execute("SELECT MatchID FROM schedule")}
+            missing = [match_id for match_id, _, _, _ in results if match_id not in known]
+            if missing:
+                raise KeyError(f"schedule 表中找不到比赛 {', '.join(map(str, missing))}")
+            for match_id, rows, h_total, a_total in results:
+                # 与 Google Sheet 的增量写入相同：旧行原位覆盖，多出的行追加，少了的行删除
+                old_rows = [r[0] for r in db.execute(
+                    "SELECT rowid FROM matchlogs WHERE MatchID = ? ORDER BY rowid", (match_id,))]
+                values = [[row.get(col) for col in columns] for row in rows]
+                n_overwrite = min(len(old_rows), len(values))
+                db.executemany(update, [v + [r] for v, r in zip(values[:n_overwrite], old_rows)])
+                db.executemany(insert, values[n_overwrite:])
+                db.executemany("DELETE FROM matchlogs WHERE rowid = ?", [(r,) for r in old_rows[n_overwrite:]])
+                db.execute(
+                    "UPDATE schedule SET Status = 'Done', HomeTotalPoints = ?, AwayTotalPoints = ? WHERE MatchID = ?",
+                    (h_total, a_total, match_id),
+                )
+            db.execute("UPDATE meta SET value = value + 1 WHERE key = 'revision'")
+            # 同一事务内加一，写入前的修订号就是写入后减一
+            revision = db.execute("SELECT value FROM meta WHERE key = 'revision'").fetchone()[0]
+        revisions = (revision - 1, revision)
+
+        if self.sync_target is not None:
+            try:
+                self.sync_target.save_matches(results)
+            except Exception as e:
+                raise SyncError(f"已保存到本地，但同步 {self.sync_target.label} 失败: {e}", revisions) from e
+        return revisions
+
+
+# ==============================================================================
+# 按 secrets 配置创建后端 (所有会话共用一个实例)
+# ==============================================================================
+def _gsheets_storage(settings):
+    # 只有用到 Google Sheet 时才导入，离线运行不需要 st-gsheets-connection
+    from streamlit_gsheets import GSheetsConnection
+
+    storage = GSheetsStorage(st.connection("gsheets", type=GSheetsConnection))
+    if settings.get("write_behind", False):
+        # write_queue 依赖本模块，放在这里导入避免循环引用
+        from write_queue import WriteBehindStorage
+
+        storage = WriteBehindStorage(storage, settings.get("queue_path", "sfl_pending.jsonl"))
+    return storage
+
+
+@st.cache_resource(show_spinner=False)
+def get_storage():
+    settings = st.secrets.get("storage", {})
+    backend = settings.get("backend", "gsheets")
+
+    if backend == "gsheets":
+        return _gsheets_storage(settings)
+    if backend == "sqlite":
+        sync_target = _gsheets_storage(settings) if settings.get("sync_gsheets", False) else None
+        return SQLiteStorage(settings.get("path", "sfl.db"), sync_target=sync_target)
+    raise ValueError(f"未知的存储后端: {backend} (可选 gsheets / sqlite)")
+
+
+# ==============================================================================
+# 离线初始化本地数据库
+# ==============================================================================
+# 不连接 Google Sheet 时，用三张表导出的 CSV 初始化 (或整表替换) SQLite 文件：
+#
+#   python storage.py sfl.db schedule.csv matchlogs.csv configs.csv
+if __name__ == "__main__":
+    import sys
+
+    if len(sys.argv) != 5:
+        sys.exit("用法: python storage.py <数据库文件> <schedule.csv> <matchlogs.csv> <configs.csv>")
+    db_path, *csv_paths = sys.argv[1:]
+    frames = [pd.read_csv(path) for path in csv_paths]
+    SQLiteStorage(db_path).import_frames(*frames)
+    print(f"已导入 {db_path}: " + ", ".join(f"{name} {len(df)} 行" for name, df in zip(SHEET_NAMES, frames)))
@@ -0,0 +1,60 @@
+import pandas as pd
+
+from benchmarks.bench_core import make_league
+from config_snapshot import ConfigSnapshot
+from data_cache import DataCache
+
+# ==============================================================================
+# 配置快照：读写一致，修订号没变时不读取 configs
+# ==============================================================================
+
+
+def _config():
+    _, _, df_config = make_league(4, 10)
+    # 数字队伍名 (JSON 对象的键会变成字符串)、没有选手的队伍
+    extra = pd.DataFrame([[7, "Daigo", "Ryu"], ["Team Empty", None, None]], columns=df_config.columns)
+    return pd.concat([df_config, extra], ignore_index=True)
+
+
+def test_round_trip_keeps_team_types(tmp_path):
+    path = tmp_path / "config.json"
+    built = ConfigSnapshot.build(_config(), "r1")
+    built.save(path)
+
+    read = ConfigSnapshot.read(path, "r1")
+    assert read.team_player_map == built.team_player_map
+    assert read.team_player_map[7] == ["Daigo"]
+    assert read.teams == built.teams and "Team Empty" in read.teams
+    assert read.chars_list == built.chars_list
+    assert ConfigSnapshot.read(path, "r2") is None
+
+
+def test_reload_skips_configs_until_revision_changes(tmp_path):
+    df_schedule, df_logs, _ = make_league(4, 10)
+    df_config = _config()
+    revision, skipped = ["r1"], []
+
+    def loader(skip_config=False):
+        skipped.append(skip_config)
+        return (df_schedule, df_logs, None if skip_config else df_config), {}
+
+    def new_cache():
+        return DataCache(loader, lambda: revision[0], check_interval=0, config_path=tmp_path / "config.json")
+
+    cache = new_cache()
+    cache.get()
+    new_cache().get()
+    assert skipped == [False, True]
+
+    # 本进程写入比赛结果：修订号跟着更新，重启后仍跳过 configs
+    match_id = df_schedule["MatchID"].iloc[0]
+    rows = df_logs[df_logs["MatchID"] == match_id].to_dict("records")
+    cache.apply_matches([(match_id, rows, 40, 0)], ("r1", "r2"))
+    revision[0] = "r2"
+    new_cache().get()
+    assert skipped[-1] is True
+
+    # 表格被直接编辑：重新读取 configs
+    revision[0] = "r3"
+    new_cache().get()
+    assert skipped[-1] is False
@@ -0,0 +1,86 @@
+import random
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from aggregates import TABLES, Aggregates
+from benchmarks.bench_core import _random_score, make_league
+from data_cache import DataCache
+from matchups import Matchups
+from ratings import Ratings
+from scoring import score_match
+
+# ==============================================================================
+# 差量更新与整表重算的一致性
+# ==============================================================================
+# 录入时共享缓存只对改动的比赛打补丁 (data_cache.patch_match)，派生数据通过
+# replace_match() 按差量更新。随机重复提交 (覆盖旧比赛、录入未完成的比赛、
+# 加赛出现 / 消失、"无" 的占位) 之后，结果必须与在最终数据上 build() 完全一致。
+# 运行：python -m pytest
+
+N_SUBMITS = 200
+BUILDERS = {
+    "aggregates": lambda s, l: Aggregates.build(s, l),
+    "ratings": lambda s, l: Ratings.build(l),
+    "matchups": lambda s, l: Matchups.build(l),
+}
+
+
+@pytest.fixture(scope="module")
+def submitted():
+    df_schedule, df_logs, df_config = make_league(8, 300)
+    # 最后 40 场还没有录入
+    df_schedule = df_schedule.copy()
+    df_schedule.loc[df_schedule.index[-40:], ["Status", "HomeTotalPoints", "AwayTotalPoints"]] = \
+        ["Pending", None, None]
+    df_logs = df_logs[df_logs["MatchID"].isin(df_schedule["MatchID"][:-40])].reset_index(drop=True)
+
+    cache = DataCache(loader=lambda: ((df_schedule, df_logs, df_config), {}))
+    snapshot = cache.get()
+    for key, build in BUILDERS.items():
+        snapshot.derive(key, lambda: build(snapshot.schedule, snapshot.logs))
+
+    rng = random.Random(1)
+    match_ids = df_schedule["MatchID"].tolist()
+    for _ in range(N_SUBMITS):
+        match_id = rng.choice(match_ids)
+        battles = [{
+            "Position": position,
+            "HomePlayer": rng.choice(["Daigo", "Fuudo", "无"]), "HomeChar": rng.choice(["Ryu", "Ken", "无"]),
+            "AwayPlayer": rng.choice(["Nemo", "Tokido"]), "AwayChar": rng.choice(["Ryu", "Ken", "无"]),
+            "Score": _random_score(rng, position),
+        } for position in ("Vanguard", "Center", "General", "Extra")]
+        try:
+            rows, h_total, a_total = score_match(match_id, battles, drop_unused_extra=True)
+        except ValueError:
+            continue
+        cache.apply_matches([(match_id, rows, h_total, a_total)])
+
+    snapshot = cache.get()
+    assert snapshot.version > 1
+    return snapshot
+
+
+def test_aggregates_match_full_build(submitted):
+    incremental = submitted.derive("aggregates", None)
+    full = Aggregates.build(submitted.schedule, submitted.logs)
+    for name in TABLES:
+        pd.testing.assert_frame_equal(getattr(incremental, name), getattr(full, name), obj=name)
+
+
+def test_ratings_match_full_build(submitted):
+    incremental = submitted.derive("ratings", None)
+    full = Ratings.build(submitted.logs)
+    assert incremental.matches == full.matches
+    for inc, ref in zip(incremental.state, full.state):
+        assert inc.keys() == ref.keys()
+        assert np.allclose([inc[k] for k in ref], [ref[k] for k in ref])
+
+
+def test_matchups_match_full_build(submitted):
+    incremental = submitted.derive("matchups", None)
+    full = Matchups.build(submitted.logs)
+    for kind in ("players", "characters"):
+        for inc, ref in zip(getattr(incremental, kind).frame(), getattr(full, kind).frame()):
+            pd.testing.assert_frame_equal(inc, ref, obj=kind)
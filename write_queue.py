@@ -0,0 +1,251 @@
+import json
+import os
+import threading
+import time
+
+import perf
+from data_cache import patch_match
+from storage import Storage
+
+# ==============================================================================
+# Google Sheet 后台写入队列 (write-behind)
+# ==============================================================================
+# 录入时不再同步等待 Sheets API：
+#   1. 结果先追加到本地日志文件 (JSON Lines，每行一场，写完 fsync)，立即返回；
+#   2. 后台线程把待写入的比赛合并成一次 save_matches 批量写入；
+#      同一场比赛在写入前被重复提交时只保留最后一次 (按 MatchID 合并)；
+#   3. 写入失败 (限流、网络错误等) 按指数退避重试，数据一直保留在日志文件里，
+#      进程重启后从日志恢复，不会丢失录入；
+#   4. 整批写入失败时逐场重试，只有出错的那几场留在队列里，不会因为一场坏数据
+#      (例如 Schedule 表里已被删掉的比赛) 挡住其他比赛。只有别的比赛能写入、这一场单独写入
+#      仍失败时才计入它的失败次数，累计 MAX_ATTEMPTS 次后暂停自动重试，等管理员在侧边栏
+#      "立即重试" 或 "丢弃"；所有比赛都写不进去 (限流、网络故障) 时只退避重试，不会暂停；
+#   5. 读取时把尚未写入的比赛叠加到读到的数据上，页面立即显示新结果。
+# 在 secrets 中开启：
+#
+#   [storage]
+#   write_behind = true
+#   queue_path = "sfl_pending.jsonl"
+
+# 收到提交后等待多久再写入，把连续的几次提交合并成一批 (秒)
+BATCH_DELAY = 1.0
+# 重试间隔：RETRY_BASE × 2^(失败次数-1)，最长 RETRY_MAX (秒)
+RETRY_BASE = 5
+RETRY_MAX = 300
+# 同一场比赛单独写入失败 (同时有别的比赛写入成功) 多少次后暂停自动重试
+MAX_ATTEMPTS = 5
+
+
+def _json_value(value):
+    # numpy 标量 -> Python 值
+    if hasattr(value, "item"):
+        return value.item()
+    raise TypeError(f"无法写入日志: {value!r}")
+
+
+def _result(entry):
+    return entry["match_id"], entry["rows"], entry["h_total"], entry["a_total"]
+
+
+class WriteBehindStorage(Storage):
+    write_behind = True
+
+    def __init__(self, target, path):
+        self.target = target
+        self.label = target.label
+        self.config_snapshot_path = target.config_snapshot_path
+        self.path = path
+
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._pending = self._read_journal()   # {MatchID: entry}，保持提交顺序；entry 里记录失败次数
+        self.failures = 0
+        self.last_error = None
+        self.next_retry = None
+        self._suspects = set()   # 上一次逐场重试时单独写入失败的比赛，下次最后再试
+        # 写入成功后的回调，参数为 save_matches 返回的 (写入前, 写入后) 修订号；
+        # 共享缓存用它记下自己这次写入产生的修订号 (见 DataCache.confirm_write)
+        self.on_flush = None
+
+        threading.Thread(target=self._run, name="sfl-write-behind", daemon=True).start()
+        if self.retrying():
+            self._wake.set()
+
+    # --- Storage 接口 ---
+    def load(self, skip_config=False):
+        (df_schedule, df_logs, df_config), timings = self.target.load(skip_config)
+        for entry in self.pending().values():
+            df_schedule, df_logs, _, _ = patch_match(df_schedule, df_logs, *_result(entry))
+        return (df_schedule, df_logs, df_config), timings
+
+    def revision(self):
+        return self.target.revision()
+
+    def save_matches(self, results):
+        entries = [
+            {"match_id": match_id, "rows": rows, "h_total": h_total, "a_total": a_total, "queued_at": time.time()}
+            for match_id, rows, h_total, a_total in results
+        ]
+        new_keys = {str(entry["match_id"]) for entry in entries}
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                for entry in entries:
+                    f.write(json.dumps(entry, ensure_ascii=False, default=_json_value) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            for entry in entries:
+                # 同一场重复提交：后一次覆盖前一次，并移到队尾
+                self._pending.pop(str(entry["match_id"]), None)
+                self._pending[str(entry["match_id"])] = entry
+            # 退避期间不提前唤醒，避免在限流时反复请求；但如果卡住的都是单独写入也失败的比赛
+            # (多半是这几场的数据有问题)，新提交的比赛不用陪着等到退避结束
+            backing_off = self.failures > 0 and any(
+                key not in self._suspects for key in self._pending if key not in new_keys)
+        perf.count("write_queue.enqueued", len(entries))
+        if not backing_off:
+            self._wake.set()
+        # 还没有写入目标存储，修订号未知：写入完成后通过 on_flush 通知
+        return None
+
+    # --- 队列状态 ---
+    def pending(self):
+        with self._lock:
+            return dict(self._pending)
+
+    def retrying(self):
+        # 仍在自动重试的比赛 (不含已暂停的)
+        with self._lock:
+            return {key: entry for key, entry in self._pending.items() if entry.get("attempts", 0) < MAX_ATTEMPTS}
+
+    def retry_now(self):
+        # 已暂停的比赛也重新开始计数
+        with self._lock:
+            for entry in self._pending.values():
+                entry["attempts"] = 0
+            self.next_retry = None
+        self._wake.set()
+
+    def discard(self, match_id):
+        # 放弃写入某场比赛 (只从队列和日志文件中删除，目标存储里的数据不变)
+        with self._lock:
+            if self._pending.pop(str(match_id), None) is None:
+                return False
+            self._suspects.discard(str(match_id))
+            self._write_journal()
+        perf.count("write_queue.discarded")
+        return True
+
+    def flush(self):
+        # 把当前所有待写入的比赛写入目标存储；全部成功返回 True
+        with self._flush_lock:
+            batch = self.retrying()
+            if not batch:
+                return True
+            errors, isolated, written = {}, False, []
+            try:
+                with perf.span("write_queue.flush", matches=len(batch)):
+                    written.append(self.target.save_matches([_result(e) for e in batch.values()]))
+            except Exception as e:
+                errors = {key: e for key in batch}
+                if len(batch) > 1:
+                    errors, isolated = self._write_separately(batch, written)
+                else:
+                    self._suspects.update(batch)
+
+            with self._lock:
+                for key, entry in batch.items():
+                    # 写入期间又被重新提交 / 丢弃的比赛不受这次结果影响
+                    if self._pending.get(key) is not entry:
+                        continue
+                    if key not in errors:
+                        del self._pending[key]
+                        continue
+                    entry["error"] = str(errors[key])
+                    if isolated:
+                        entry["attempts"] = entry.get("attempts", 0) + 1
+                self._write_journal()
+
+                # 出错的比赛都已暂停时不需要退避，等管理员处理
+                backoff = any(key in self._pending and self._pending[key].get("attempts", 0) < MAX_ATTEMPTS
+                              for key in errors)
+                if backoff:
+                    self.failures += 1
+                    self.last_error = str(next(iter(errors.values())))
+                    delay = min(RETRY_MAX, RETRY_BASE * 2 ** (self.failures - 1))
+                    self.next_retry = time.time() + delay
+                    # 写入期间收到的新提交也等到退避结束再一起重试
+                    self._wake.clear()
+                else:
+                    self.failures = 0
+                    self.last_error = None
+                    self.next_retry = None
+
+            if self.on_flush is not None:
+                # 逐场重试时按写入顺序依次通知，修订号前后衔接
+                for revisions in written:
+                    self.on_flush(revisions)
+            if errors:
+                perf.count("write_queue.failed", len(errors))
+                return False
+            return True
+
+    def _write_separately(self, batch, written):
+        # 整批写入失败后逐场重试，成功写入的修订号追加到 written。
+        # 返回 ({MatchID: 异常}, 是否有比赛单独写入成功)；
+        # 没有任何一场成功时说明是限流 / 网络故障，而不是某一场的数据有问题。
+        # 上次单独失败过的比赛排在最后；还没有一场成功就已失败两场时停止，
+        # 避免在限流期间每场都再发一遍请求
+        errors, succeeded = {}, False
+        keys = sorted(batch, key=lambda key: key in self._suspects)
+        for i, key in enumerate(keys):
+            try:
+                written.append(self.target.save_matches([_result(batch[key])]))
+                succeeded = True
+                self._suspects.discard(key)
+            except Exception as e:
+                errors[key] = e
+                self._suspects.add(key)
+                if not succeeded and len(errors) >= 2:
+                    errors.update({k: e for k in keys[i + 1:]})
+                    break
+        return errors, succeeded
+
+    # --- 后台线程 ---
+    def _run(self):
+        while True:
+            timeout = max(0.0, self.next_retry - time.time()) if self.next_retry else None
+            self._wake.wait(timeout)
+            self._wake.clear()
+            time.sleep(BATCH_DELAY)
+            try:
+                self.flush()
+            except Exception as e:
+                # 例如日志文件写不进去：记录错误，线程继续运行，等下一次提交或 "立即重试"
+                self.last_error = f"写入队列出错: {e}"
+
+    # --- 日志文件 ---
+    def _read_journal(self):
+        pending = {}
+        if not os.path.exists(self.path):
+            return pending
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    # 进程在写入一半时退出：最后一行不完整，跳过
+                    continue
+                pending.pop(str(entry["match_id"]), None)
+                pending[str(entry["match_id"])] = entry
+        return pending
+
+    def _write_journal(self):
+        # 写入成功后压缩日志：只保留仍在队列中的比赛 (先写临时文件再替换，避免写一半)
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            for entry in self._pending.values():
+                f.write(json.dumps(entry, ensure_ascii=False, default=_json_value) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.path)